@@ -28,6 +28,50 @@ document.addEventListener("DOMContentLoaded", () => {
 
 
 
+// правильне підключення TikTok embed
+function loadTiktokEmbed() {
+  if (!document.querySelector('script[src="https://www.tiktok.com/embed.js"]')) {
+    const script = document.createElement("script");
+    script.src = "https://www.tiktok.com/embed.js";
+    script.async = true;
+    document.body.appendChild(script);
+  }
+}
+
+// facade → real embed: every poster link becomes the blockquote embed.js expects
+function upgradeTiktokFacade(videoBlock) {
+  videoBlock.querySelectorAll(".tiktok-facade").forEach(link => {
+    const quote = document.createElement("blockquote");
+    quote.className = "tiktok-embed";
+    quote.cite = link.href;
+    quote.dataset.videoId = link.dataset.videoId;
+    quote.dataset.embedFrom = "embed_page";
+    quote.style.cssText = "max-width:605px; min-width:325px;";
+    quote.appendChild(document.createElement("section"));
+    link.replaceWith(quote);
+  });
+  loadTiktokEmbed();
+}
+
+// consent is granted: load the embed once the block comes near the viewport
+function armTiktokFacade(videoBlock) {
+  if (videoBlock.dataset.facadeArmed) return;
+  videoBlock.dataset.facadeArmed = "true";
+
+  if (!("IntersectionObserver" in window)) {
+    upgradeTiktokFacade(videoBlock);
+    return;
+  }
+  const observer = new IntersectionObserver(entries => {
+    if (entries.some(entry => entry.isIntersecting)) {
+      observer.disconnect();
+      upgradeTiktokFacade(videoBlock);
+    }
+  }, { rootMargin: videoBlock.dataset.facadeMargin || "200px" });
+  observer.observe(videoBlock);
+}
+
+
 // Dependecy inversion anchor
 // lock to tiktok, to cookie_consent_v2
 function ApplyConsentPolicyTiktok(consentDict) {
@@ -36,9 +80,10 @@ function ApplyConsentPolicyTiktok(consentDict) {
     const videoBlock = document.getElementById("tiktok-video_id");
     const mockBlock = document.getElementById("tiktok-mock");
 
-    const allowed =
-      consentDict?.statistics === true &&
-      consentDict?.marketing === true;
+    // facade mode: the categories come from content.facade.consent
+    const required = videoBlock?.dataset.facadeConsent?.split(" ").filter(Boolean)
+      ?? ["statistics", "marketing"];
+    const allowed = required.every(key => consentDict?.[key] === true);
 
     console.log("ApplyConsentPolicyTiktok called!");
 
@@ -48,12 +93,10 @@ function ApplyConsentPolicyTiktok(consentDict) {
       if (videoBlock) videoBlock.style.display = "flex";
       if (mockBlock) mockBlock.style.display = "none";
 
-      // правильне підключення TikTok embed
-      if (!document.querySelector('script[src="https://www.tiktok.com/embed.js"]')) {
-        const script = document.createElement("script");
-        script.src = "https://www.tiktok.com/embed.js";
-        script.async = true;
-        document.body.appendChild(script);
+      if (videoBlock?.dataset.facadeConsent !== undefined) {
+        armTiktokFacade(videoBlock);
+      } else {
+        loadTiktokEmbed();
       }
 
     } else {
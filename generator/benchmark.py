@@ -0,0 +1,288 @@
+"""Scaling benchmarks for the site pipeline on synthetic backbones.
+
+A synthetic tree mirrors the repository layout (json_backbone/, blocks/, sites/, generator/sites.txt),
+so every stage runs exactly as in a real build.
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from generator.core.cli_core3 import ROOT_NAME, Backbone, Jinja2Parser, Site, get_environment
+from generator.core.fragments import get_fragment_cache
+from generator.core.pool import render_sites
+from generator.core.validate_json import SCHEMA_REGISTRY, SchemaValidator
+
+
+class BenchConfig(NamedTuple):
+    sites: int = 6
+    langs: int = 2
+    blocks: int = 18
+    depth: int = 3
+    content_size: int = 10  # items per block
+
+
+BLOCK_TEMPLATE = """<section class="{name}">
+  <h2>{{{{ content.title }}}}</h2>
+  {{%- for item in content.items %}}
+  <p>{{{{ item.text }}}}</p>
+  {{%- endfor %}}
+{children}
+</section>
+"""
+ROOT_TEMPLATE = """<!DOCTYPE html>
+<html lang="{{ content.lang }}">
+<head>
+  <style>
+    {{ text_css }}
+  </style>
+</head>
+<body>
+{children}
+  <script>
+    {{ text_js }}
+  </script>
+</body>
+</html>
+"""
+CHILD_TEMPLATE = '  {{{{ inline_blocks.get("{name}","") | safe | indent }}}}'
+BLOCK_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "title": {"type": "string"},
+        "items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "additionalProperties": False,
+                "properties": {"text": {"type": "string"}},
+                "required": ["text"],
+            },
+        },
+    },
+    "required": ["title", "items"],
+}
+
+
+def _levels(config: BenchConfig) -> List[List[str]]:
+    names = [f"block_{number:04d}" for number in range(config.blocks)]
+    depth = max(1, min(config.depth, len(names) or 1))
+    return [names[level::depth] for level in range(depth)]
+
+
+def generate_tree(root: Path, config: BenchConfig) -> None:
+    """Write a synthetic backbone with ``config.blocks`` blocks per site arranged in ``config.depth`` levels."""
+    levels = _levels(config)
+    children: Dict[str, List[str]] = {}
+    for level, names in enumerate(levels):
+        below = levels[level + 1] if level + 1 < len(levels) else []
+        for index, name in enumerate(names):
+            children[name] = below[index :: len(names)] if below else []
+
+    blocks_directory = root / "blocks"
+    for name in (name for names in levels for name in names):
+        block_directory = blocks_directory / name
+        block_directory.mkdir(parents=True)
+        child_lines = "\n".join(CHILD_TEMPLATE.format(name=child) for child in children[name])
+        (block_directory / "base.j2").write_text(BLOCK_TEMPLATE.format(name=name, children=child_lines), encoding="utf-8")
+        (block_directory / "base.css").write_text(f".{name} {{ padding: 8px; margin: 0 auto; }}\n", encoding="utf-8")
+        (block_directory / "base.js").write_text(f"document.querySelectorAll('.{name}').forEach(function (el) {{ el.dataset.ready = '1'; }});\n")
+        (block_directory / "content.schema").write_text(json.dumps(BLOCK_SCHEMA, indent=2), encoding="utf-8")
+
+    root_directory = blocks_directory / ROOT_NAME
+    root_directory.mkdir(parents=True)
+    root_children = "\n".join(CHILD_TEMPLATE.format(name=child) for child in levels[0])
+    (root_directory / "base.j2").write_text(ROOT_TEMPLATE.replace("{children}", root_children), encoding="utf-8")
+    root_schema = {"type": "object", "additionalProperties": False, "properties": {"lang": {"type": "string"}}, "required": ["lang"]}
+    (root_directory / "content.schema").write_text(json.dumps(root_schema, indent=2), encoding="utf-8")
+
+    json_directory = root / "json_backbone"
+    json_directory.mkdir(parents=True)
+    langs = [f"l{number}" for number in range(config.langs)]
+    sites = [f"site_{number:03d}" for number in range(config.sites)]
+    for lang in langs:
+        entrypoint = {"block_name": ROOT_NAME, "content_type": "shared", "content_lang": lang, "inline_blocks": levels[0], "content": {"lang": lang}}
+        (json_directory / f"shared_{lang}.json").write_text(json.dumps([entrypoint], indent=2), encoding="utf-8")
+        for site in sites:
+            site_blocks = []
+            for name in (name for names in levels for name in names):
+                content = {"title": f"{site} {name} {lang}", "items": [{"text": f"{name} item {item} " * 4} for item in range(config.content_size)]}
+                site_blocks.append(
+                    {"block_name": name, "content_type": site, "content_lang": lang, "inline_blocks": children[name], "content": content}
+                )
+            (json_directory / f"{site}_{lang}.json").write_text(json.dumps(site_blocks, indent=2), encoding="utf-8")
+
+    (root / "sites").mkdir()
+    (root / "generator").mkdir()
+    (root / "generator" / "sites.txt").write_text("\n".join(f"{site}:{lang}" for site in sites for lang in langs), encoding="utf-8")
+
+
+@contextlib.contextmanager
+def _working_directory(path: Path) -> Iterator[None]:
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _measure(function: Callable[[], Any], repeat: int, reset: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """Time ``repeat`` runs of ``function``; ``reset`` runs untimed before each one."""
+    timings = []
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            function()
+        timings.append(time.perf_counter() - start)
+    return {"min": min(timings), "median": statistics.median(timings)}
+
+
+def _cold_caches() -> None:
+    """Forget rendered fragments and verified payloads so every repeat measures a cold build."""
+    get_fragment_cache().clear()
+    SCHEMA_REGISTRY.clear()
+
+
+def run_config(config: BenchConfig, repeat: int = 3, jobs: int = 1, block_jobs: int = 1) -> Dict[str, Any]:
+    """Timings of every stage plus the fragment cache hits/misses of one (cold) ``parse_site`` run."""
+    with tempfile.TemporaryDirectory(prefix="sitegen-bench-") as directory:
+        root = Path(directory)
+        generate_tree(root, config)
+        with _working_directory(root):
+            json_directory, block_directory, sites_directory = Path("json_backbone"), Path("blocks"), Path("sites")
+            backbone = Backbone(json_directory, block_directory)
+            snapshot = backbone.load_snapshot()
+            site_list = [{"site_name": f"site_{n:03d}", "lang": f"l{m}"} for n in range(config.sites) for m in range(config.langs)]
+            schema = json.loads((block_directory / "block_0000" / "content.schema").read_text(encoding="utf-8"))
+            payloads = [block.content.get_content_dict() for block in snapshot.blocks if block.block_name != ROOT_NAME]
+            get_environment(block_directory)
+
+            def setup_blocks() -> None:
+                for item in site_list:
+                    Site(item["site_name"], item["lang"], ROOT_NAME).setup_blocks(snapshot)  # type: ignore
+
+            def parse_sites() -> None:
+                for item in site_list:
+                    site = Site(item["site_name"], item["lang"], ROOT_NAME)  # type: ignore
+                    site.setup_blocks(snapshot)
+                    Jinja2Parser(site, block_directory, jobs=block_jobs).parse_site()
+
+            def verify_json() -> None:
+                validator = SchemaValidator()
+                for payload in payloads:
+                    validator.verify_json(schema, payload)
+
+            def regenerate() -> None:
+                results = render_sites(site_list, json_directory, block_directory, sites_directory, backbone.load_snapshot(), jobs=jobs)
+                errors = [result.error for result in results if result.error is not None]
+                if errors:
+                    raise RuntimeError(errors[0])
+
+            cache = get_fragment_cache()
+            timings = {
+                "collect_blocks": _measure(backbone.collect_blocks, repeat),
+                "setup_blocks": _measure(setup_blocks, repeat),
+                "parse_site": _measure(parse_sites, repeat, _cold_caches),
+            }
+            fragments = {"hits": cache.hits, "misses": cache.misses}
+            timings["verify_json"] = _measure(verify_json, repeat)
+            timings["regenerate"] = _measure(regenerate, repeat, _cold_caches)
+            return {"timings": timings, "fragments": fragments}
+
+
+def run(configs: List[BenchConfig], repeat: int = 3, jobs: int = 1, block_jobs: int = 1) -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "jobs": jobs,
+        "block_jobs": block_jobs,
+        "results": [dict(run_config(config, repeat, jobs, block_jobs), config=config._asdict()) for config in configs],
+    }
+
+
+# name -> (arguments, extra environment) of CLI invocations whose startup time is measured.
+STARTUP_COMMANDS: Dict[str, Any] = {
+    "help": (["--help"], {}),
+    "sites": (["sites"], {}),
+    "complete_site": ([], {"_SITEGEN_COMPLETE": "complete_bash", "COMP_WORDS": "sitegen build c", "COMP_CWORD": "2"}),
+    "complete_lang": ([], {"_SITEGEN_COMPLETE": "complete_bash", "COMP_WORDS": "sitegen build consular ", "COMP_CWORD": "3"}),
+}
+_CLI = "from generator.cli import app; app(prog_name='sitegen')"
+
+
+def _measure_process(arguments: List[str], environment: Dict[str, str], repeat: int) -> Dict[str, float]:
+    timings = []
+    env = dict(os.environ, **environment)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", _CLI, *arguments], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        timings.append(time.perf_counter() - start)
+    return {"min": min(timings), "median": statistics.median(timings)}
+
+
+def run_startup(repeat: int = 5) -> Dict[str, Any]:
+    """Wall time of fresh ``sitegen`` processes in the current project, including interpreter start."""
+    return {
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "results": [
+            {"config": {"startup": name}, "timings": {"startup": _measure_process(arguments, environment, repeat)}}
+            for name, (arguments, environment) in STARTUP_COMMANDS.items()
+        ],
+    }
+
+
+def format_startup(report: Dict[str, Any]) -> str:
+    lines = [f"{'command'.ljust(20)} {'median':>10} {'min':>10}"]
+    for item in report["results"]:
+        timing = item["timings"]["startup"]
+        lines.append(f"{item['config']['startup'].ljust(20)} {timing['median'] * 1000:8.1f}ms {timing['min'] * 1000:8.1f}ms")
+    return "\n".join(lines)
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25) -> List[str]:
+    """Return a message for every timing that is slower than the baseline by more than ``tolerance``."""
+    regressions = []
+    baseline_results = {json.dumps(item["config"], sort_keys=True): item["timings"] for item in baseline.get("results", [])}
+    for item in report["results"]:
+        previous = baseline_results.get(json.dumps(item["config"], sort_keys=True))
+        if previous is None:
+            continue
+        for name, timing in item["timings"].items():
+            if name in previous and timing["median"] > previous[name]["median"] * (1 + tolerance):
+                ratio = timing["median"] / previous[name]["median"]
+                regressions.append(f"{name} {item['config']}: {previous[name]['median']:.4f}s -> {timing['median']:.4f}s (x{ratio:.2f})")
+    return regressions
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    names = list(report["results"][0]["timings"]) if report["results"] else []
+    lines = [f"{'sites x langs x blocks (depth, size)'.ljust(38)}" + "".join(f" {name:>15}" for name in names) + f" {'fragments hit/miss':>20}"]
+    for item in report["results"]:
+        config = item["config"]
+        label = f"{config['sites']} x {config['langs']} x {config['blocks']} ({config['depth']}, {config['content_size']})"
+        fragments = item.get("fragments", {})
+        cache = f"{fragments.get('hits', '-')}/{fragments.get('misses', '-')}"
+        lines.append(label.ljust(38) + "".join(f" {item['timings'][name]['median'] * 1000:13.1f}ms" for name in names) + f" {cache:>20}")
+    return "\n".join(lines)
+
+
+def load_report(path: Optional[Path]) -> Optional[Dict[str, Any]]:
+    if path is None or not path.exists():
+        return None
+    data: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+    return data
@@ -1,11 +1,14 @@
+import functools
+import json
 import os
-from bs4 import BeautifulSoup
+import sys
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
 
 ROOT_DIR = "sites"
 HTML_EXT = ".html"
 
-# html_file -> list of problems
-RESULTS = {}
+Issue = Dict[str, Optional[str]]
 
 
 def is_external(url: str) -> bool:
@@ -21,70 +24,84 @@ def is_external(url: str) -> bool:
     )
 
 
-def report_problem(html_file, tag, attr, link, resolved, reason):
-    RESULTS.setdefault(html_file, []).append(
-        {
-            "tag": tag,
-            "attr": attr,
-            "link": link,
-            "resolved": resolved,
-            "reason": reason,
-        }
-    )
+@functools.lru_cache(maxsize=None)
+def path_exists(path: str) -> bool:
+    return os.path.exists(path)
+
+
+class LinkExtractor(HTMLParser):
+    """Collects (tag, attr, link) for every local reference in a single streaming pass."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.links: List[Tuple[str, str, str]] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = dict(attrs)
+        # <a href>, <link href>
+        if tag in ("a", "link") and attributes.get("href"):
+            self.links.append((tag, "href", str(attributes["href"])))
+        # <img src>, <script src>, ...
+        if attributes.get("src"):
+            self.links.append((tag, "src", str(attributes["src"])))
+        # SVG <use href | xlink:href>
+        if tag == "use":
+            href = attributes.get("href") or attributes.get("xlink:href")
+            file_part = href.split("#")[0] if href else ""
+            if file_part:
+                self.links.append(("use", "href", file_part))
 
 
-def check_file_exists(html_file, link, tag, attr):
+def check_link(html_file: str, tag: str, attr: str, link: str) -> Optional[Issue]:
     if not link or is_external(link):
-        return
+        return None
 
     # ❌ абсолютні шляхи заборонені
     if link.startswith("/"):
-        report_problem(html_file, tag, attr, link, None, "absolute path is not allowed")
-        return
+        return {"tag": tag, "attr": attr, "link": link, "resolved": None, "reason": "absolute path is not allowed"}
 
     # ✔ тільки відносні шляхи (від HTML-файлу)
     path = os.path.normpath(os.path.join(os.path.dirname(html_file), link))
 
-    if not os.path.exists(path):
-        report_problem(html_file, tag, attr, link, path, "file not found")
+    if not path_exists(path):
+        return {"tag": tag, "attr": attr, "link": link, "resolved": path, "reason": "file not found"}
+    return None
 
 
-def scan_html(html_file):
-    RESULTS.setdefault(html_file, [])
-
+def scan_html(html_file: str) -> List[Issue]:
+    extractor = LinkExtractor()
     with open(html_file, "r", encoding="utf-8", errors="ignore") as f:
-        soup = BeautifulSoup(f, "lxml")
+        for chunk in iter(lambda: f.read(65536), ""):
+            extractor.feed(chunk)
+    extractor.close()
 
-    # <a href>
-    for a in soup.find_all("a", href=True):
-        check_file_exists(html_file, a["href"], "a", "href")
+    issues = []
+    for tag, attr, link in extractor.links:
+        issue = check_link(html_file, tag, attr, link)
+        if issue is not None:
+            issues.append(issue)
+    return issues
 
-    # <link href>
-    for link in soup.find_all("link", href=True):
-        check_file_exists(html_file, link["href"], "link", "href")
 
-    # <img src>, <script src>
-    for tag in soup.find_all(src=True):
-        check_file_exists(html_file, tag["src"], tag.name, "src")
+def find_html_files(root_dir: str = ROOT_DIR) -> List[str]:
+    html_files = []
+    for root, _, files in os.walk(root_dir):
+        for file in files:
+            if file.endswith(HTML_EXT):
+                html_files.append(os.path.join(root, file))
+    return sorted(html_files)
 
-    # SVG <use href | xlink:href>
-    for use in soup.find_all("use"):
-        href = use.get("href") or use.get("xlink:href")
-        if href:
-            file_part = href.split("#")[0]
-            if file_part:
-                check_file_exists(html_file, file_part, "use", "href")
 
+def check_site(root_dir: str = ROOT_DIR) -> Dict[str, List[Issue]]:
+    """Scan every HTML file under ``root_dir``; returns html_file -> list of problems."""
+    path_exists.cache_clear()
+    return {html_file: scan_html(html_file) for html_file in find_html_files(root_dir)}
 
-def main():
-    for root, _, files in os.walk(ROOT_DIR):
-        for file in files:
-            if file.endswith(HTML_EXT):
-                scan_html(os.path.join(root, file))
 
+def print_results(results: Dict[str, List[Issue]]) -> bool:
     has_errors = False
 
-    for html_file, issues in sorted(RESULTS.items()):
+    for html_file, issues in sorted(results.items()):
         if not issues:
             print(f"[OK] {html_file}")
         else:
@@ -96,10 +113,30 @@ def main():
                 else:
                     print(f'  <{i["tag"]}> {i["attr"]}="{i["link"]}"\n  → not found: {i["resolved"]}')
             print()
+    return has_errors
+
+
+def write_report(results: Dict[str, List[Issue]], report_file: str, root_dir: str = ROOT_DIR) -> None:
+    report = {
+        "root": root_dir,
+        "files": len(results),
+        "broken": sum(len(issues) for issues in results.values()),
+        "results": results,
+    }
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+
 
-    if has_errors:
-        exit(1)
+def main(root_dir: str = ROOT_DIR, report_file: Optional[str] = None) -> bool:
+    """Check all pages; returns True when every local reference resolves."""
+    results = check_site(root_dir)
+    has_errors = print_results(results)
+    if report_file is not None:
+        write_report(results, report_file, root_dir)
+    return not has_errors
 
 
 if __name__ == "__main__":
-    main()
+    if not main():
+        sys.exit(1)
@@ -1,9 +1,18 @@
 from __future__ import annotations
+from enum import Enum
+import json
 from pathlib import Path
+import os
 import typer
-from typing import List, Dict
-from generator.core.cli_core3 import main, get_sites
-from generator.m404 import generate_404
+from typing import List, Dict, Optional, TYPE_CHECKING
+from generator.core.sites import get_sites, sites_index
+
+# The rendering stack (Jinja2, jsonschema, ...) is imported inside the commands that use it,
+# so `sitegen sites`, --help and shell completion start quickly.
+if TYPE_CHECKING:  # pragma: no cover
+    from generator.core.budget import BudgetReport
+    from generator.core.cli_core3 import BuildOptions
+    from generator.core.manifest import BuildManifest
 
 app = typer.Typer(
     name="sitegen",
@@ -20,29 +29,169 @@ BASE = Path("./")
 JSON_DIRECTORY = BASE / "json_backbone"
 BLOCK_DIRECTORY = BASE / "blocks"
 SITES_DIRECTORY = BASE / "sites"
+CACHE_DIRECTORY = BASE / ".sitegen_cache"
+MANIFEST_FILE = BASE / "sites_manifest.json"
+SITES_FILE = BASE / "generator" / "sites.txt"
+SITES_INDEX_FILE = CACHE_DIRECTORY / "sites_index.json"
+BUNDLE_FILE = CACHE_DIRECTORY / "site_bundle.zip"
+BUDGET_FILE = BASE / "generator" / "budgets.json"
+BUDGET_REPORT_FILE = BASE / "sites_budget.json"
+HINTS_FILE = BASE / "generator" / "resource_hints.json"
+
+
+class AssetMode(str, Enum):
+    inline = "inline"
+    external = "external"
+
+
+ASSETS_OPTION = typer.Option(AssetMode.inline, "--assets", help="Inline block CSS/JS into each page or emit shared sites/assets bundles")
+MINIFY_ASSETS_OPTION = typer.Option(False, "--minify-assets", help="Minify and deduplicate block CSS/JS")
+MINIFY_HTML_OPTION = typer.Option(False, "--minify-html", help="Collapse template whitespace and drop comments in the generated HTML")
+PURGE_CSS_OPTION = typer.Option(False, "--purge-css", help="Drop inline CSS rules whose classes/ids never appear in the page or its scripts")
+CRITICAL_CSS_OPTION = typer.Option(False, "--critical-css", help="Keep above-the-fold CSS in <head> and move the rest to the end of <body>")
+RESOURCE_HINTS_OPTION = typer.Option(
+    False, "--resource-hints", help="Add preconnect/dns-prefetch/preload links to <head>, configured per site in generator/resource_hints.json"
+)
+COMPRESS_OPTION = typer.Option(False, "--compress", help="Write precompressed .gz (and .br if brotli is installed) next to each page")
+CHECK_OPTION = typer.Option(True, "--check/--no-check", help="Check local links and assets of sites/ after the build")
+PROFILE_OPTION = typer.Option(None, "--profile", help="Write a Chrome trace of build phases to this file and print the slowest blocks")
+IMAGES_OPTION = typer.Option(False, "--images", help="Generate responsive variants of sites/sources images and emit srcset/width/height")
+SVG_SPRITE_OPTION = typer.Option(
+    False, "--svg-sprite", help="Optimize icon/flag/logo SVGs into one hashed sprite (small ones inline) used by svg_icon()"
+)
+BLOCK_JOBS_OPTION = typer.Option(
+    1, "--block-jobs", min=1, help="Threads for independent blocks of a page; they only overlap I/O, Jinja rendering still holds the GIL"
+)
+BUNDLE_OPTION = typer.Option(True, "--bundle/--no-bundle", help="Use the `sitegen compile` bundle when it matches the sources")
+BUDGET_OPTION = typer.Option(True, "--budget/--no-budget", help="Record per-block page weights and check them against generator/budgets.json")
 
 
 def complete_site(incomplete: str) -> List[str]:
-    sites = [k["site_name"] for k in get_sites()]
+    sites = sites_index(str(SITES_FILE), SITES_INDEX_FILE)
     return [site for site in sites if site.startswith(incomplete)]
 
 
 def complete_lang(ctx: typer.Context, incomplete: str) -> List[str]:
     site = ctx.params.get("site")
 
-    langs = [k["lang"] for k in get_sites() if k["site_name"] == site]
+    langs = sites_index(str(SITES_FILE), SITES_INDEX_FILE).get(str(site), [])
     if not langs:
         return langs
     return [lang for lang in langs if lang.startswith(incomplete)]
 
 
+def _cache_directory(enabled: bool) -> Optional[Path]:
+    return CACHE_DIRECTORY if enabled else None
+
+
+def _build_options(
+    assets: AssetMode,
+    minify_assets: bool,
+    images: bool,
+    minify_html: bool,
+    compress: bool,
+    purge_css: bool,
+    critical_css: bool,
+    resource_hints: bool,
+    svg_sprite: bool,
+) -> BuildOptions:
+    from generator.core.cli_core3 import BuildOptions
+    from generator.core.images import optimize_images
+    from generator.core.sprites import build_sprite
+
+    if images:
+        optimize_images(SITES_DIRECTORY)
+    if svg_sprite:
+        build_sprite(SITES_DIRECTORY)
+    return BuildOptions(
+        assets=assets.value,
+        minify_assets=minify_assets,
+        images=images,
+        minify_html=minify_html,
+        compress=compress,
+        purge_css=purge_css,
+        critical_css=critical_css,
+        svg_sprite=svg_sprite,
+        resource_hints=str(HINTS_FILE) if resource_hints else "",
+    )
+
+
+def _bundle(enabled: bool, cache_directory: Optional[Path]) -> Optional[Path]:
+    """Install a fresh compiled bundle into this process; returns its path for worker processes."""
+    if not enabled or not BUNDLE_FILE.exists():
+        return None
+    from generator.core.bundle import use_bundle
+
+    if not use_bundle(BUNDLE_FILE, JSON_DIRECTORY, BLOCK_DIRECTORY, cache_directory):
+        return None
+    print(f"Using compiled bundle {BUNDLE_FILE}.")
+    return BUNDLE_FILE
+
+
+def _manifest(force: bool) -> BuildManifest:
+    from generator.core.manifest import BuildManifest
+
+    return BuildManifest(MANIFEST_FILE, force=force)
+
+
+def _budget_report(enabled: bool) -> Optional[BudgetReport]:
+    from generator.core.budget import BudgetReport
+
+    if not enabled:
+        return None
+    report = BudgetReport(BUDGET_REPORT_FILE)
+    report.start_build()
+    return report
+
+
+def _check_budget(report: BudgetReport, budgets_file: Path = BUDGET_FILE) -> bool:
+    """Print overruns with a per-block breakdown of each page concerned; True when within budget."""
+    from generator.core.budget import Budgets, check_budgets, format_page
+
+    if not budgets_file.exists():
+        return True
+    overruns = check_budgets(report, Budgets.load(budgets_file))
+    for page_name in sorted({overrun.page for overrun in overruns}):
+        print(format_page(report, page_name) + "\n")
+    for overrun in overruns:
+        print(f"[OVER BUDGET] {overrun}")
+    return not overruns
+
+
+def _remove_unused_bundles() -> None:
+    from generator.core.assets import remove_unused_bundles
+
+    for name in remove_unused_bundles(SITES_DIRECTORY / "assets", SITES_DIRECTORY.glob("*.html")):
+        print(f"Removed unused bundle {name}")
+
+
+def _check_links(report: Optional[Path] = None) -> None:
+    from generator import check_assets
+
+    if not check_assets.main(str(SITES_DIRECTORY), str(report) if report is not None else None):
+        raise typer.Exit(code=1)
+
+
+def _start_profile(profile: Optional[Path]) -> None:
+    from generator.core.profiler import PROFILER
+
+    if profile is not None:
+        PROFILER.enable()
+
+
+def _finish_profile(profile: Optional[Path]) -> None:
+    from generator.core.profiler import PROFILER
+
+    if profile is not None:
+        PROFILER.write_trace(profile)
+        PROFILER.disable()
+        print(PROFILER.summary())
+        print(f"Trace written to {profile} (open in chrome://tracing or https://ui.perfetto.dev)")
+
+
 @app.command(help="List available sites")
 def sites() -> None:
-    result: Dict[str, List[str]] = {}
-    for item in get_sites():
-        if item["site_name"] not in result:
-            result[item["site_name"]] = []
-        result[item["site_name"]].append(item["lang"])
+    result: Dict[str, List[str]] = sites_index(str(SITES_FILE))
 
     for site_name, langs in result.items():
         print(f"{str(site_name).ljust(30)} {langs}")
@@ -52,25 +201,259 @@ def sites() -> None:
 def build(
     site: str = typer.Argument(..., autocompletion=complete_site),
     lang: str = typer.Argument(..., autocompletion=complete_lang),
+    cache: bool = typer.Option(False, "--cache/--no-cache", help="Keep compiled templates in .sitegen_cache between runs"),
+    force: bool = typer.Option(False, "--force", help="Render even if the build manifest shows no changes"),
+    assets: AssetMode = ASSETS_OPTION,
+    minify_assets: bool = MINIFY_ASSETS_OPTION,
+    minify_html: bool = MINIFY_HTML_OPTION,
+    compress: bool = COMPRESS_OPTION,
+    purge_css: bool = PURGE_CSS_OPTION,
+    critical_css: bool = CRITICAL_CSS_OPTION,
+    resource_hints: bool = RESOURCE_HINTS_OPTION,
+    images: bool = IMAGES_OPTION,
+    svg_sprite: bool = SVG_SPRITE_OPTION,
+    check: bool = CHECK_OPTION,
+    profile: Optional[Path] = PROFILE_OPTION,
+    block_jobs: int = BLOCK_JOBS_OPTION,
+    bundle: bool = BUNDLE_OPTION,
+    budget: bool = BUDGET_OPTION,
 ) -> None:
-    main(JSON_DIRECTORY, BLOCK_DIRECTORY, SITES_DIRECTORY, site, lang)
+    from generator.core.cli_core3 import main
+    from generator.m404 import generate_404
+
+    _start_profile(profile)
+    _bundle(bundle, _cache_directory(cache))
+    manifest = _manifest(force)
+    budget_report = _budget_report(budget)
+    main(
+        JSON_DIRECTORY,
+        BLOCK_DIRECTORY,
+        SITES_DIRECTORY,
+        site,
+        lang,
+        cache_directory=_cache_directory(cache),
+        manifest=manifest,
+        options=_build_options(assets, minify_assets, images, minify_html, compress, purge_css, critical_css, resource_hints, svg_sprite),
+        block_jobs=block_jobs,
+        budget=budget_report,
+    )
+    manifest.save()
+    _remove_unused_bundles()
+    if budget_report is not None:
+        budget_report.save()
+    _finish_profile(profile)
     print("Building ...")
     generate_404()
+    if check:
+        _check_links()
 
 
 @app.command(
     help=("Full rebuild of all sites.\nRuns full pipeline for each site:\n  clean → split → validate → build\nUseful for CI/CD or full regeneration.")
 )
-def regenerate() -> None:
+def regenerate(
+    cache: bool = typer.Option(False, "--cache/--no-cache", help="Keep compiled templates in .sitegen_cache between runs"),
+    force: bool = typer.Option(False, "--force", help="Render every page even if the build manifest shows no changes"),
+    jobs: Optional[int] = typer.Option(None, "--jobs", "-j", min=1, help="Number of worker processes [default: CPU count]"),
+    assets: AssetMode = ASSETS_OPTION,
+    minify_assets: bool = MINIFY_ASSETS_OPTION,
+    minify_html: bool = MINIFY_HTML_OPTION,
+    compress: bool = COMPRESS_OPTION,
+    purge_css: bool = PURGE_CSS_OPTION,
+    critical_css: bool = CRITICAL_CSS_OPTION,
+    resource_hints: bool = RESOURCE_HINTS_OPTION,
+    images: bool = IMAGES_OPTION,
+    svg_sprite: bool = SVG_SPRITE_OPTION,
+    check: bool = CHECK_OPTION,
+    profile: Optional[Path] = PROFILE_OPTION,
+    block_jobs: int = BLOCK_JOBS_OPTION,
+    bundle: bool = BUNDLE_OPTION,
+    budget: bool = BUDGET_OPTION,
+) -> None:
+    from generator.core.budget import format_changes
+    from generator.core.cli_core3 import Backbone
+    from generator.core.pool import render_sites
+    from generator.core.profiler import PROFILER
+    from generator.m404 import generate_404
+
     print("Regenerating...")
     msg = ""
-    for item in get_sites():
-        site_name = item["site_name"]
-        lang = item["lang"]
-        main(JSON_DIRECTORY, BLOCK_DIRECTORY, SITES_DIRECTORY, site_name, lang)
-        msg += f"Site: {str(site_name).ljust(30)} {lang} regenerated.\n"
+    failed = False
+    _start_profile(profile)
+    bundle_file = _bundle(bundle, _cache_directory(cache))
+    with PROFILER.phase("backbone load"):
+        backbone = Backbone(JSON_DIRECTORY, BLOCK_DIRECTORY).load_snapshot()
+    manifest = _manifest(force)
+    budget_report = _budget_report(budget)
+    results = render_sites(
+        get_sites(str(SITES_FILE)),
+        JSON_DIRECTORY,
+        BLOCK_DIRECTORY,
+        SITES_DIRECTORY,
+        backbone,
+        jobs=jobs or os.cpu_count() or 1,
+        cache_directory=_cache_directory(cache),
+        manifest=manifest,
+        options=_build_options(assets, minify_assets, images, minify_html, compress, purge_css, critical_css, resource_hints, svg_sprite),
+        block_jobs=block_jobs,
+        bundle=bundle_file,
+        budget=budget_report,
+    )
+    for result in results:
+        print(result.log, end="")
+        if result.error is not None:
+            failed = True
+            status = "FAILED"
+        else:
+            status = "regenerated" if result.rendered else "up to date"
+        msg += f"Site: {str(result.site_name).ljust(30)} {result.lang} {status}.\n"
+    manifest.save()
+    _remove_unused_bundles()
+    if budget_report is not None:
+        budget_report.save()
+    _finish_profile(profile)
     print(msg)
+    if failed:
+        for result in results:
+            if result.error is not None:
+                print(f"[ERROR] {result.site_name} {result.lang}\n{result.error}")
+        raise typer.Exit(code=1)
+    if budget_report is not None:
+        for line in format_changes(budget_report):
+            print(f"Weight: {line}")
+        if not _check_budget(budget_report):
+            raise typer.Exit(code=1)
     generate_404()
+    if check:
+        _check_links()
+
+
+@app.command("compile", help="Compile block templates, schemas and the backbone index into one bundle used by build/regenerate")
+def compile_sources(
+    output: Path = typer.Option(BUNDLE_FILE, "--output", help="Bundle file to write"),
+) -> None:
+    from generator.core.bundle import compile_bundle
+
+    bundle = compile_bundle(output, JSON_DIRECTORY, BLOCK_DIRECTORY)
+    metadata = bundle.metadata
+    print(
+        f"Compiled {len(metadata['templates'])} templates, {len(metadata['schemas'])} schemas"
+        f" and {len(metadata['backbone'])} backbone files into {output}."
+    )
+
+
+@app.command(help="Validate every block payload of json_backbone/ against its schema and report all errors")
+def validate(
+    jobs: int = typer.Option(1, "--jobs", "-j", min=1, help="Worker processes validating unique payloads"),
+    context: int = typer.Option(3, "--context", min=0, help="Source lines shown around each error"),
+) -> None:
+    from generator.core.validation import format_issue, validate_backbone
+
+    report = validate_backbone(JSON_DIRECTORY, BLOCK_DIRECTORY, jobs=jobs, context=context)
+    for issue in report.issues:
+        print(format_issue(issue) + "\n")
+    print(f"Validated {report.payloads} payloads ({report.unique} unique) in {report.files} files: {len(report.issues)} error(s).")
+    if report.issues:
+        raise typer.Exit(code=1)
+
+
+@app.command(help="Show per-block page weights of the last build and check them against the budgets")
+def budget(
+    page: Optional[List[str]] = typer.Option(None, "--page", help="Only these page files, e.g. consular_ua.html (repeatable)"),
+    budgets: Path = typer.Option(BUDGET_FILE, "--budgets", help="JSON file with per-page and per-block budgets"),
+) -> None:
+    from generator.core.budget import BudgetReport, format_page
+
+    report = BudgetReport(BUDGET_REPORT_FILE)
+    if not report.pages:
+        print(f"No page weights in {BUDGET_REPORT_FILE}; run `sitegen regenerate --force` first.")
+        raise typer.Exit(code=1)
+    for page_name in sorted(report.pages):
+        if not page or page_name in page:
+            print(format_page(report, page_name) + "\n")
+    if not budgets.exists():
+        print(f"No budgets file {budgets}; nothing to check.")
+        return
+    if not _check_budget(report, budgets):
+        raise typer.Exit(code=1)
+    print(f"[OK] all pages within {budgets}")
+
+
+@app.command(help="Check that every local link and asset referenced from sites/*.html exists")
+def check(
+    report: Optional[Path] = typer.Option(None, "--report", help="Write a JSON report to this file"),
+) -> None:
+    _check_links(report)
+
+
+@app.command(help="Serve sites/ locally, rebuild SITE LANG when its sources change and live-reload the browser")
+def serve(
+    site: str = typer.Argument(..., autocompletion=complete_site),
+    lang: str = typer.Argument(..., autocompletion=complete_lang),
+    host: str = typer.Option("127.0.0.1", "--host", help="Address to bind"),
+    port: int = typer.Option(8000, "--port", help="Port to listen on"),
+    cache: bool = typer.Option(False, "--cache/--no-cache", help="Keep compiled templates in .sitegen_cache between runs"),
+    assets: AssetMode = ASSETS_OPTION,
+    minify_assets: bool = MINIFY_ASSETS_OPTION,
+    minify_html: bool = MINIFY_HTML_OPTION,
+    compress: bool = COMPRESS_OPTION,
+    purge_css: bool = PURGE_CSS_OPTION,
+    critical_css: bool = CRITICAL_CSS_OPTION,
+    resource_hints: bool = RESOURCE_HINTS_OPTION,
+    images: bool = IMAGES_OPTION,
+    svg_sprite: bool = SVG_SPRITE_OPTION,
+) -> None:
+    from generator.core.serve import DevServer
+
+    server = DevServer(
+        JSON_DIRECTORY,
+        BLOCK_DIRECTORY,
+        SITES_DIRECTORY,
+        site,
+        lang,
+        manifest=_manifest(False),
+        sites_file=SITES_FILE,
+        cache_directory=_cache_directory(cache),
+        options=_build_options(assets, minify_assets, images, minify_html, compress, purge_css, critical_css, resource_hints, svg_sprite),
+    )
+    server.serve_forever(host, port)
+
+
+@app.command(help="Benchmark the pipeline on synthetic backbones and compare against a stored baseline")
+def bench(
+    sites: List[int] = typer.Option([6], "--sites", help="Number of sites; repeat the option to measure a scaling curve"),
+    langs: int = typer.Option(2, "--langs", help="Languages per site"),
+    blocks: int = typer.Option(18, "--blocks", help="Blocks per site"),
+    depth: int = typer.Option(3, "--depth", help="Levels of inline_blocks nesting"),
+    content_size: int = typer.Option(10, "--content-size", help="Content items per block"),
+    repeat: int = typer.Option(3, "--repeat", min=1, help="Runs per measurement; the median is reported"),
+    jobs: int = typer.Option(1, "--jobs", "-j", min=1, help="Worker processes for the regenerate measurement"),
+    block_jobs: int = typer.Option(1, "--block-jobs", min=1, help="Block threads for the parse_site measurement"),
+    output: Optional[Path] = typer.Option(None, "--output", help="Write the machine-readable report to this file"),
+    baseline: Optional[Path] = typer.Option(None, "--baseline", help="Compare against a previous --output report"),
+    tolerance: float = typer.Option(0.25, "--tolerance", help="Allowed slowdown against the baseline (0.25 = 25%)"),
+    startup: bool = typer.Option(False, "--startup", help="Measure CLI startup and shell completion time instead of the pipeline"),
+) -> None:
+    from generator import benchmark
+
+    if startup:
+        report = benchmark.run_startup(repeat=repeat)
+        print(benchmark.format_startup(report))
+    else:
+        configs = [benchmark.BenchConfig(site_count, langs, blocks, depth, content_size) for site_count in sites]
+        report = benchmark.run(configs, repeat=repeat, jobs=jobs, block_jobs=block_jobs)
+        print(benchmark.format_report(report))
+    if output is not None:
+        output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+    previous = benchmark.load_report(baseline)
+    if previous is not None:
+        regressions = benchmark.compare(report, previous, tolerance)
+        for regression in regressions:
+            print(f"[REGRESSION] {regression}")
+        if regressions:
+            raise typer.Exit(code=1)
+        print("[OK] no regressions against baseline")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,137 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable, List
+import hashlib
+import re
+
+_CSS_TOKEN = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)""", re.S)
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,])\s*")
+# A "/" after one of these starts a regular expression literal, not a division.
+_JS_REGEX_PREFIX = set("(,=:[!&|?{};+-*%<>~^")
+_BUNDLE_NAME = re.compile(r"site\.[0-9a-f]{16}\.(?:css|js)")
+
+
+def minify_css(text: str) -> str:
+    """Drop comments and redundant whitespace; string literals are kept verbatim.
+
+    >>> minify_css('a , b { content: " ; } , x" ; }')
+    'a,b{content: " ; } , x"}'
+    """
+    parts: List[str] = []
+    code: List[str] = []
+    position = 0
+    for match in _CSS_TOKEN.finditer(text):
+        code.append(text[position : match.start()])
+        string, _comment, space = match.groups()
+        if string:
+            parts.append(_collapse_css("".join(code)))
+            parts.append(string)
+            code = []
+        elif space:
+            code.append(" ")
+        position = match.end()
+    code.append(text[position:])
+    parts.append(_collapse_css("".join(code)))
+    return "".join(parts).strip()
+
+
+def _collapse_css(code: str) -> str:
+    return _CSS_PUNCTUATION.sub(r"\1", code).replace(";}", "}")
+
+
+def minify_js(text: str) -> str:
+    """Drop comments and indentation while keeping line breaks for automatic semicolon insertion.
+
+    String, template and regular expression literals are copied verbatim.
+    """
+    result: List[str] = []
+    i = 0
+    length = len(text)
+    last = ""
+    while i < length:
+        char = text[i]
+        if char in "'\"`":
+            end = i + 1
+            while end < length and text[end] != char:
+                end += 2 if text[end] == "\\" else 1
+            result.append(text[i : end + 1])
+            last = char
+            i = end + 1
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = length if end == -1 else end
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = length if end == -1 else end + 2
+            if result and not result[-1].isspace():
+                result.append(" ")
+        elif char == "/" and (last == "" or last in _JS_REGEX_PREFIX):
+            end = i + 1
+            in_class = False
+            while end < length and (text[end] != "/" or in_class) and text[end] != "\n":
+                if text[end] == "\\":
+                    end += 1
+                elif text[end] == "[":
+                    in_class = True
+                elif text[end] == "]":
+                    in_class = False
+                end += 1
+            result.append(text[i : end + 1])
+            last = "/"
+            i = end + 1
+        elif char.isspace():
+            end = i
+            while end < length and text[end].isspace():
+                end += 1
+            if result:
+                result.append("\n" if "\n" in text[i:end] else " ")
+            i = end
+        else:
+            result.append(char)
+            last = char
+            i += 1
+
+    lines = "".join(result).split("\n")
+    return "\n".join(line.strip() for line in lines if line.strip())
+
+
+def build_asset_text(parts: Iterable[str], kind: str, minify: bool) -> str:
+    """Join block assets, skipping parts whose content was already included."""
+    seen = set()
+    unique: List[str] = []
+    for part in parts:
+        text = (minify_css(part) if kind == "css" else minify_js(part)) if minify else part
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if text and digest not in seen:
+            seen.add(digest)
+            unique.append(text)
+    return "\n".join(unique)
+
+
+def write_bundle(assets_directory: Path, kind: str, text: str) -> str:
+    """Write a content-hashed bundle into ``assets_directory`` and return its file name."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    name = f"site.{digest}.{kind}"
+    bundle = assets_directory / name
+    if not bundle.exists():
+        assets_directory.mkdir(parents=True, exist_ok=True)
+        bundle.write_text(text, encoding="utf-8")
+    return name
+
+
+def remove_unused_bundles(assets_directory: Path, pages: Iterable[Path]) -> List[str]:
+    """Delete bundles none of ``pages`` links any more and return their names.
+
+    Each page gets the bundle of its own blocks, so a bundle is superseded only once no page refers to it.
+    """
+    if not assets_directory.is_dir():
+        return []
+    used = set()
+    for page in pages:
+        used.update(_BUNDLE_NAME.findall(page.read_text(encoding="utf-8")))
+    removed = []
+    for bundle in sorted(assets_directory.iterdir()):
+        if _BUNDLE_NAME.fullmatch(bundle.name) and bundle.name not in used:
+            bundle.unlink()
+            removed.append(bundle.name)
+    return removed
@@ -0,0 +1,185 @@
+"""Page weight per block, checked against per-page and per-block budgets."""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+import json
+import re
+
+REPORT_VERSION = 1
+BLOCK_METRICS = ("html", "css", "js", "requests")
+PAGE_METRICS = ("bytes",) + BLOCK_METRICS
+# Elements that make the browser fetch something when the page loads.
+REQUEST_RE = re.compile(r"<(?:img|iframe)\b|<script\b[^>]*?\bsrc\s*=", re.IGNORECASE)
+
+
+def count_requests(html: str) -> int:
+    return len(REQUEST_RE.findall(html))
+
+
+class BlockWeight(NamedTuple):
+    block_name: str
+    html: int  # bytes of the block's own markup, without the fragments and assets it inlines
+    css: int
+    js: int
+    requests: int
+
+    def metrics(self) -> Dict[str, int]:
+        return {metric: getattr(self, metric) for metric in BLOCK_METRICS}
+
+
+def page_metrics(entry: Dict[str, Any]) -> Dict[str, int]:
+    metrics: Dict[str, int] = {"bytes": entry["bytes"]}
+    metrics.update((metric, sum(block[metric] for block in entry["blocks"].values())) for metric in BLOCK_METRICS)
+    return metrics
+
+
+class BudgetReport:
+    """Weights of every generated page, committed next to the build manifest.
+
+    Pages skipped by the manifest keep the entry of the build that wrote them, so every page is
+    checked on each build, including after a change to the budgets alone. ``previous`` holds the
+    entries as they were before this build, so every report can show what changed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._pages: Dict[str, Dict[str, Any]] = {}
+        self.previous: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    def load(self) -> None:
+        self._pages = {}
+        self.previous = {}
+        if not self.path.exists():
+            return
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if isinstance(data, dict) and data.get("version") == REPORT_VERSION:
+            self._pages = data.get("pages", {})
+            self.previous = data.get("previous", {})
+
+    def start_build(self) -> None:
+        """Make the current entries the baseline the next ``save()`` is compared against."""
+        self.previous = json.loads(json.dumps(self._pages))
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": REPORT_VERSION, "pages": self._pages, "previous": self.previous}
+        self.path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    @property
+    def pages(self) -> Dict[str, Dict[str, Any]]:
+        return self._pages
+
+    def entry(self, page_name: str) -> Optional[Dict[str, Any]]:
+        return self._pages.get(page_name)
+
+    def set_entry(self, page_name: str, entry: Dict[str, Any]) -> None:
+        self._pages[page_name] = entry
+
+    def record(self, site_file: Path, weights: Iterable[BlockWeight]) -> None:
+        self._pages[site_file.name] = {
+            "bytes": site_file.stat().st_size,
+            "blocks": {weight.block_name: weight.metrics() for weight in weights},
+        }
+
+
+class Budgets(NamedTuple):
+    """Limits read from a JSON file; every section and metric is optional.
+
+    ``page``/``block`` apply to every page/block, ``pages``/``blocks`` override them by page file
+    name or block name::
+
+        {"page": {"bytes": 80000}, "pages": {"consular_ua.html": {"requests": 12}},
+         "block": {"requests": 4}, "blocks": {"tiktok_block": {"js": 6000}}}
+    """
+
+    page: Dict[str, int]
+    pages: Dict[str, Dict[str, int]]
+    block: Dict[str, int]
+    blocks: Dict[str, Dict[str, int]]
+
+    @classmethod
+    def load(cls, path: Path) -> "Budgets":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        budgets = cls(data.get("page", {}), data.get("pages", {}), data.get("block", {}), data.get("blocks", {}))
+        sections = [("page", budgets.page, PAGE_METRICS), ("block", budgets.block, BLOCK_METRICS)]
+        sections += [(f"pages.{name}", limits, PAGE_METRICS) for name, limits in budgets.pages.items()]
+        sections += [(f"blocks.{name}", limits, BLOCK_METRICS) for name, limits in budgets.blocks.items()]
+        for section, limits, metrics in sections:
+            unknown = set(limits) - set(metrics)
+            if unknown:
+                raise ValueError(f"{path}: unknown budget metric(s) {', '.join(sorted(unknown))} in {section}")
+        return budgets
+
+    def for_page(self, page_name: str) -> Dict[str, int]:
+        return dict(self.page, **self.pages.get(page_name, {}))
+
+    def for_block(self, block_name: str) -> Dict[str, int]:
+        return dict(self.block, **self.blocks.get(block_name, {}))
+
+
+class Overrun(NamedTuple):
+    page: str
+    block: str  # empty for page budgets
+    metric: str
+    value: int
+    limit: int
+
+    def __str__(self) -> str:
+        where = f"{self.page} [{self.block}]" if self.block else self.page
+        return f"{where}: {self.metric} {self.value:,} > {self.limit:,} (+{self.value - self.limit:,})"
+
+
+def check_budgets(report: BudgetReport, budgets: Budgets) -> List[Overrun]:
+    overruns = []
+    for page_name, entry in sorted(report.pages.items()):
+        metrics = page_metrics(entry)
+        for metric, limit in sorted(budgets.for_page(page_name).items()):
+            if metrics[metric] > limit:
+                overruns.append(Overrun(page_name, "", metric, metrics[metric], limit))
+        for block_name, block in entry["blocks"].items():
+            for metric, limit in sorted(budgets.for_block(block_name).items()):
+                if block[metric] > limit:
+                    overruns.append(Overrun(page_name, block_name, metric, block[metric], limit))
+    return overruns
+
+
+def _cell(value: int, previous: Optional[int]) -> str:
+    if previous is None:
+        return f"{value:,} (new)"
+    delta = value - previous
+    return f"{value:,} ({delta:+,})" if delta else f"{value:,}"
+
+
+def format_page(report: BudgetReport, page_name: str) -> str:
+    """Per-block breakdown of one page, heaviest block first, with deltas against the previous build."""
+    entry = report.pages[page_name]
+    previous = report.previous.get(page_name)
+    previous_blocks: Dict[str, Dict[str, int]] = previous["blocks"] if previous is not None else {}
+    previous_page = page_metrics(previous) if previous is not None else {}
+
+    cells = "  ".join(f"{metric}={_cell(value, previous_page.get(metric))}" for metric, value in page_metrics(entry).items())
+    lines = [f"{page_name}  {cells}"]
+    lines.append(f"  {'block':<28}" + "".join(f"{metric:>18}" for metric in BLOCK_METRICS))
+    blocks = sorted(entry["blocks"].items(), key=lambda item: -(item[1]["html"] + item[1]["css"] + item[1]["js"]))
+    for block_name, block in blocks:
+        before = previous_blocks.get(block_name, {})
+        cells = "".join(f"{_cell(block[metric], before.get(metric)):>18}" for metric in BLOCK_METRICS)
+        lines.append(f"  {block_name:<28}{cells}")
+    for block_name in sorted(set(previous_blocks) - set(entry["blocks"])):
+        lines.append(f"  {block_name:<28}{'(removed)':>18}")
+    return "\n".join(lines)
+
+
+def format_changes(report: BudgetReport) -> List[str]:
+    """One line per page whose weight changed since the previous build."""
+    lines = []
+    for page_name, entry in sorted(report.pages.items()):
+        previous = report.previous.get(page_name)
+        if previous == entry:
+            continue
+        before = page_metrics(previous) if previous is not None else {}
+        cells = "  ".join(f"{metric}={_cell(value, before.get(metric))}" for metric, value in page_metrics(entry).items())
+        lines.append(f"{page_name}  {cells}")
+    return lines
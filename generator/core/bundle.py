@@ -0,0 +1,122 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import json
+import os
+import zipfile
+
+import jinja2
+from jinja2 import FileSystemLoader, ModuleLoader, meta
+
+from generator.core.cli_core3 import LazyBackbone, install_environment, make_environment, seed_backbone_index
+from generator.core.fragments import TemplateInfo, get_fragment_cache, hash_text
+from generator.core.validate_json import SCHEMA_REGISTRY, ContentValidator
+
+BUNDLE_VERSION = 1
+BUNDLE_METADATA = "bundle.json"
+
+
+def _signature(path: Path) -> List[int]:
+    stat = path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def source_signatures(json_directory: Path, block_directory: Path) -> Dict[str, List[int]]:
+    """(mtime, size) of every source a bundle replaces; any difference makes the bundle stale."""
+    sources = sorted(Path(block_directory).glob("*/base.j2")) + sorted(Path(block_directory).glob("*/content.schema"))
+    sources += sorted(Path(json_directory).glob("*.json"))
+    return {path.as_posix(): _signature(path) for path in sources}
+
+
+class SiteBundle:
+    """Ahead-of-time build inputs packed into one zip file.
+
+    The archive holds every block template compiled to a Python module (imported straight from the
+    zip by Jinja's ModuleLoader) and ``bundle.json`` with the parsed schemas, template hashes and
+    variables, the backbone index and the signatures of the sources it was built from.
+    """
+
+    def __init__(self, path: Path, metadata: Dict[str, Any]) -> None:
+        self.path = path
+        self.metadata = metadata
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["SiteBundle"]:
+        """The bundle at ``path``, or None when it is missing, unreadable or built by another version."""
+        try:
+            with zipfile.ZipFile(path) as archive:
+                metadata = json.loads(archive.read(BUNDLE_METADATA).decode("utf-8"))
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+        if metadata.get("version") != BUNDLE_VERSION or metadata.get("jinja2") != jinja2.__version__:
+            return None
+        return cls(path, metadata)
+
+    def stale_sources(self, json_directory: Path, block_directory: Path) -> List[str]:
+        current = source_signatures(json_directory, block_directory)
+        recorded = self.metadata["sources"]
+        return sorted(name for name in set(current) | set(recorded) if current.get(name) != recorded.get(name))
+
+    def install(self, json_directory: Path, block_directory: Path, cache_directory: Optional[Path] = None) -> None:
+        """Serve templates, schemas and the backbone index of this process from the bundle."""
+        install_environment(block_directory, cache_directory, make_environment(ModuleLoader(str(self.path))))
+        fragments = get_fragment_cache(cache_directory)
+        sources = self.metadata["sources"]
+        for name, template in self.metadata["templates"].items():
+            template_path = Path(block_directory) / name / "base.j2"
+            signature = tuple(sources[template_path.as_posix()])
+            fragments.seed(template_path, TemplateInfo((signature[0], signature[1]), template["digest"], frozenset(template["variables"])))
+        for name, schema in self.metadata["schemas"].items():
+            schema_path = Path(block_directory) / name / "content.schema"
+            signature = tuple(sources[schema_path.as_posix()])
+            SCHEMA_REGISTRY.seed(schema_path, (signature[0], signature[1]), schema["digest"], schema["schema"])
+        seed_backbone_index(json_directory, self.metadata["backbone"])
+
+
+def compile_bundle(path: Path, json_directory: Path, block_directory: Path) -> SiteBundle:
+    """Compile templates, schemas and the backbone index of the current sources into ``path``."""
+    signatures = source_signatures(json_directory, block_directory)
+    # A fresh environment: the shared one may already load from a previous bundle.
+    env = make_environment(FileSystemLoader(str(block_directory)))
+
+    templates: Dict[str, Dict[str, Any]] = {}
+    for template_path in sorted(Path(block_directory).glob("*/base.j2")):
+        source = template_path.read_text(encoding="utf-8")
+        variables = sorted(meta.find_undeclared_variables(env.parse(source)))
+        templates[template_path.parent.name] = {"digest": hash_text(source), "variables": variables}
+
+    schemas: Dict[str, Dict[str, Any]] = {}
+    for schema_path in sorted(Path(block_directory).glob("*/content.schema")):
+        raw_schema = schema_path.read_text(encoding="utf-8")
+        schema = json.loads(raw_schema)
+        ContentValidator.check_schema(schema)
+        schemas[schema_path.parent.name] = {"digest": hash_text(raw_schema), "schema": schema}
+
+    metadata = {
+        "version": BUNDLE_VERSION,
+        "jinja2": jinja2.__version__,
+        "sources": signatures,
+        "templates": templates,
+        "schemas": schemas,
+        "backbone": LazyBackbone(json_directory, block_directory).index_data(),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    env.compile_templates(str(temporary), filter_func=lambda name: name.endswith("/base.j2"), zip="deflated", ignore_errors=False)
+    with zipfile.ZipFile(temporary, "a", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(BUNDLE_METADATA, json.dumps(metadata, ensure_ascii=False, sort_keys=True))
+    os.replace(temporary, path)
+    return SiteBundle(path, metadata)
+
+
+def use_bundle(path: Path, json_directory: Path, block_directory: Path, cache_directory: Optional[Path] = None) -> bool:
+    """Install the bundle at ``path`` if it matches the sources; otherwise keep loading from sources."""
+    bundle = SiteBundle.load(path)
+    if bundle is None:
+        return False
+    stale = bundle.stale_sources(json_directory, block_directory)
+    if stale:
+        print(f"Bundle {path} is stale ({len(stale)} changed source(s), e.g. {stale[0]}); using sources.")
+        return False
+    bundle.install(json_directory, block_directory, cache_directory)
+    return True
@@ -1,9 +1,23 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import List, Any, Dict, Tuple, Iterator, Literal
-import copy
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import List, Any, ClassVar, Dict, Tuple, Iterator, Literal, Iterable, Mapping, NamedTuple, Optional, Sequence, Set, Type, TypeVar, Union
+import hashlib
 import json
-from jinja2 import Environment, FileSystemLoader, StrictUndefined, Template
+from jinja2 import BaseLoader, BytecodeCache, Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined, Template
+from jinja2.filters import do_indent
+from generator.core.assets import build_asset_text, write_bundle
+from generator.core.budget import BlockWeight, BudgetReport, count_requests
+from generator.core.css_purge import get_css_optimizer
+from generator.core.fragments import FragmentCache, InlineReads, get_fragment_cache, hash_text
+from generator.core.hints import HintConfig, add_resource_hints
+from generator.core.images import ImageManifest, no_picture
+from generator.core.manifest import BuildManifest
+from generator.core.output import write_page
+from generator.core.profiler import PROFILER
+from generator.core.sites import get_sites
+from generator.core.sprites import SpriteManifest, no_sprite_icon
 from generator.core.validate_json import SchemaValidator
 
 Lang = Literal["ua", "ru"]
@@ -14,15 +28,50 @@ ContentType = Literal[
 ]
 
 
+class BuildOptions(NamedTuple):
+    """Output options that change the generated HTML; recorded in the build manifest."""
+
+    assets: str = "inline"  # "inline" or "external" (content-hashed files in sites/assets)
+    minify_assets: bool = False
+    images: bool = False  # srcset/width/height from sites/sources/_variants/images.json
+    minify_html: bool = False
+    compress: bool = False  # .gz (and .br) sidecars next to each page
+    purge_css: bool = False  # drop <style> rules naming classes/ids the page never uses
+    critical_css: bool = False  # keep above-the-fold rules in <head>, defer the rest to the end of <body>
+    svg_sprite: bool = False  # svg_icon() emits symbols of sites/sources/_sprites (or inline SVG) instead of <img>
+    resource_hints: str = ""  # hints config file; when set, preconnect/dns-prefetch/preload links are added to <head>
+
+
+_ContentT = TypeVar("_ContentT", bound="Content")
+
+
 class Content:
-    def __init__(self) -> None:
-        self._kwargs: Dict[str, Any]
+    """Frozen attribute view over a parsed JSON object.
+
+    Nested dicts and lists are wrapped lazily on first access and never copied.
+    JSON keys take precedence over methods, so ``content.items`` is the ``items`` field when present.
+    """
 
-    def setup_fields(self, **kwargs: Dict[str, Any]) -> None:
-        self.__dict__["_kwargs"] = kwargs
-        for key, value in self._kwargs.items():
-            self.__dict__[key] = self._value_instantiation(value)
+    __slots__ = ("_data", "_children", "_fingerprint")
+    _DEFAULTS: ClassVar[Dict[str, Any]] = {}
 
+    def __init__(self) -> None:
+        object.__setattr__(self, "_data", {})
+        object.__setattr__(self, "_children", None)
+        object.__setattr__(self, "_fingerprint", None)
+
+    @classmethod
+    def from_dict(cls: Type[_ContentT], data: Dict[str, Any]) -> _ContentT:
+        content = cls()
+        content._bind(data)
+        return content
+
+    def setup_fields(self, **kwargs: Any) -> None:
+        self._bind(kwargs)
+
+    def _bind(self, data: Dict[str, Any]) -> None:
+        object.__setattr__(self, "_data", data)
+        object.__setattr__(self, "_children", None)
         self._setup_extra_fields()
 
     def _setup_extra_fields(self) -> None:
@@ -30,54 +79,112 @@ class Content:
 
     def _value_instantiation(self, value: Any) -> Any:
         if isinstance(value, list):
-            value_list = []
-            for item in value:
-                value_list.append(self._value_instantiation(item))
-            return value_list
+            return tuple(self._value_instantiation(item) for item in value)
         if isinstance(value, dict):
-            content = Content()
-            content.setup_fields(**value)
-            return content
+            return Content.from_dict(value)
         return value
 
+    def _field(self, key: str) -> Any:
+        children = self._children
+        if children is None:
+            children = {}
+            object.__setattr__(self, "_children", children)
+        if key not in children:
+            children[key] = self._value_instantiation(self._data[key])
+        return children[key]
+
+    def __getattribute__(self, attr: str) -> Any:
+        if attr[0] != "_":
+            data = object.__getattribute__(self, "_data")
+            if attr in data:
+                return object.__getattribute__(self, "_field")(attr)
+        return object.__getattribute__(self, attr)
+
+    def __getattr__(self, attr: str) -> Any:
+        data = object.__getattribute__(self, "_data")
+        if attr in data:
+            return self._field(attr)
+        if attr in self._DEFAULTS:
+            return self._DEFAULTS[attr]
+        raise AttributeError(attr)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._data:
+            raise KeyError(key)
+        return self._field(key)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (self.__class__.from_dict, (self._data,))
+
     def __str__(self) -> str:
-        new_dict = self._kwargs.copy()
-        return json.dumps(new_dict, indent=4, ensure_ascii=False)
+        return json.dumps(self._data, indent=4, ensure_ascii=False)
 
     def __setattr__(self, attr: str, value: Any) -> None:
         raise AttributeError("Cannot modify attributes of a frozen object")
 
+    def __delattr__(self, attr: str) -> None:
+        raise AttributeError("Cannot modify attributes of a frozen object")
+
     def has_attr(self, attr: str) -> bool:
         return hasattr(self, attr)
 
     def items(self) -> Iterator[Tuple[str, Any]]:
-        for key in self._kwargs.keys():
-            yield key, self.__dict__[key]
+        for key in self._data.keys():
+            yield key, self._field(key)
 
-    def get_content_dict(self) -> Dict[str, Any]:
-        return copy.deepcopy(self._kwargs)
+    def get_content_dict(self) -> Mapping[str, Any]:
+        """Read-only view of the raw JSON object, shared with the backbone (no copy)."""
+        return MappingProxyType(self._data)
+
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            raw = json.dumps(self._data, sort_keys=True, ensure_ascii=False)
+            object.__setattr__(self, "_fingerprint", hashlib.sha256(raw.encode("utf-8")).hexdigest())
+        return str(self._fingerprint)
 
 
 class Block(Content):
-    def __init__(self) -> None:
-        self.inline_blocks: List[str]
-        self.splited: bool
-        self.block_name: str
-        self.content_type: ContentType
-        self.content_lang: Lang
-        self.content: Content
+    __slots__ = ()
+    _DEFAULTS: ClassVar[Dict[str, Any]] = {"inline_blocks": (), "splited": False}
 
-        self.__dict__["inline_blocks"] = []
-        self.__dict__["splited"] = False
+    inline_blocks: Tuple[str, ...]
+    splited: bool
+    block_name: str
+    content_type: ContentType
+    content_lang: Lang
+    content: Content
 
     def _setup_extra_fields(self) -> None:
         reserved = ["inline_blocks", "splited", "block_name", "content_type", "content_lang", "content"]
         for key in reserved:
-            if key not in self.__dict__:
+            if key not in self._data and key not in self._DEFAULTS:
                 msg = f"Dictionary is not following format! Key {key!r} not found!"
                 raise KeyError(msg)
 
 
+class BackboneSnapshot:
+    """Immutable set of parsed blocks partitioned by (content_type, content_lang)."""
+
+    def __init__(self, blocks: Iterable[Block]) -> None:
+        self._blocks: Tuple[Block, ...] = tuple(blocks)
+        index: Dict[Tuple[str, str], List[int]] = {}
+        for position, block in enumerate(self._blocks):
+            index.setdefault((block.content_type, block.content_lang), []).append(position)
+        self._index: Dict[Tuple[str, str], Tuple[int, ...]] = {key: tuple(value) for key, value in index.items()}
+
+    @property
+    def blocks(self) -> Tuple[Block, ...]:
+        return self._blocks
+
+    def select(self, content_types: Sequence[str], langs: Sequence[str]) -> List[Block]:
+        # Keep the original file order so duplicate block names resolve as before.
+        positions: List[int] = []
+        for content_type in dict.fromkeys(content_types):
+            for lang in dict.fromkeys(langs):
+                positions.extend(self._index.get((content_type, lang), ()))
+        return [self._blocks[position] for position in sorted(positions)]
+
+
 class Site:
     def __init__(self, site_name: str, lang: Lang, root_name: str) -> None:
         self._blocks: List[Block] = []
@@ -94,35 +201,60 @@ class Site:
         for block in self._blocks:
             yield block
 
-    def setup_blocks(self, all_blocks: List[Block]) -> None:
-        langs = ["common", self.lang]
-        same_lang_blocks = [b for b in all_blocks if b.content_lang in langs]
+    def setup_blocks(self, all_blocks: Union[List[Block], BackboneSnapshot]) -> None:
+        if not isinstance(all_blocks, BackboneSnapshot):
+            all_blocks = BackboneSnapshot(all_blocks)
 
+        langs = ["common", self.lang]
         content_type = ["common", "shared", self.site_name]
-        same_site_blocks = [b for b in same_lang_blocks if b.content_type in content_type]
-
-        self._blocks = self._sort_order_by_dependecies(self.root_name, same_site_blocks)
+        with PROFILER.phase("block filtering", site=self.site_name, lang=self.lang):
+            same_site_blocks = all_blocks.select(content_type, langs)
+
+        with PROFILER.phase("topological sort", site=self.site_name, lang=self.lang):
+            self._blocks = self._sort_order_by_dependecies(self.root_name, same_site_blocks)
+
+    def levels(self) -> List[List[Block]]:
+        """Group blocks so that every block depends only on blocks of earlier levels.
+
+        Blocks keep their dependency order inside a level, so the grouping is deterministic.
+        """
+        names = {b.block_name for b in self._blocks}
+        depth: Dict[str, int] = {}
+        result: List[List[Block]] = []
+        for block in self._blocks:  # dependencies always come first
+            level = max((depth[dep] + 1 for dep in block.inline_blocks if dep in names and dep in depth), default=0)
+            depth[block.block_name] = level
+            if level == len(result):
+                result.append([])
+            result[level].append(block)
+        return result
 
     def _sort_order_by_dependecies(self, root_name: str, blocks: List[Block]) -> List[Block]:
         graph = {b.block_name: b.inline_blocks for b in blocks}
         visited = set()
-        temp = set()
+        temp = {root_name}
         result = []
 
-        def dfs(node: str) -> None:
-            if node in temp:
-                raise ValueError(f"Cycle detected at {node}")
-            if node in visited:
-                return
-            temp.add(node)
-            for dep in graph.get(node, []):
-                if dep in graph:  # ігноруємо відсутні
-                    dfs(node=dep)
-            temp.remove(node)
-            visited.add(node)
-            result.append(node)
-
-        dfs(root_name)
+        # Iterative DFS: deep inline_blocks nesting must not hit the recursion limit.
+        stack: List[Tuple[str, Iterator[str]]] = [(root_name, iter(graph.get(root_name, ())))]
+        while stack:
+            node, deps = stack[-1]
+            for dep in deps:
+                if dep not in graph:  # ігноруємо відсутні
+                    continue
+                if dep in temp:
+                    raise ValueError(f"Cycle detected at {dep}")
+                if dep in visited:
+                    continue
+                temp.add(dep)
+                stack.append((dep, iter(graph[dep])))
+                break
+            else:
+                stack.pop()
+                temp.remove(node)
+                visited.add(node)
+                result.append(node)
+
         name_to_block = {b.block_name: b for b in blocks}
         return [name_to_block[name] for name in result]
 
@@ -132,76 +264,357 @@ class Backbone:
         self.json_dir = json_dir
         self.block_dir = block_dir
 
+    def _json_files(self) -> List[Path]:
+        return list(Path(self.json_dir).glob("*.json"))
+
+    def _read_json_file(self, json_file: Path) -> List[Dict[str, Any]]:
+        raw_json_data = json_file.read_text(encoding="utf-8")
+        json_data = json.loads(raw_json_data)
+        if not isinstance(json_data, list):
+            msg = f"Expected Block list, got: {type(json_data)}, {json_data}"
+            raise ValueError(msg)
+
+        for block_dict in json_data:
+            if not isinstance(block_dict, dict):
+                msg = f"Expected Block dictionary, got: {type(block_dict)}, {block_dict}"
+                raise ValueError(msg)
+        return json_data
+
     def collect_blocks(self) -> List[Block]:
         block_list = []
-        for json_file in Path(self.json_dir).glob("*.json"):
-            raw_json_data = json_file.read_text(encoding="utf-8")
-            json_data = json.loads(raw_json_data)
-            if not isinstance(json_data, list):
-                msg = f"Expected Block list, got: {type(json_data)}, {json_data}"
-                raise ValueError(msg)
+        for json_file in self._json_files():
+            for block_dict in self._read_json_file(json_file):
+                block_list.append(Block.from_dict(block_dict))
+        return block_list
 
-            for block_dict in json_data:
-                if not isinstance(block_dict, dict):
-                    msg = f"Expected Block dictionary, got: {type(block_dict)}, {block_dict}"
-                    raise ValueError(msg)
+    def load_snapshot(self) -> BackboneSnapshot:
+        return BackboneSnapshot(self.collect_blocks())
 
-                block = Block()
-                block.setup_fields(**block_dict)
-                block_list.append(block)
-        return block_list
+
+# Per-file index entries installed by a compiled bundle, keyed by the resolved json directory.
+_BACKBONE_INDEXES: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+
+def seed_backbone_index(json_dir: Path, files: Dict[str, Dict[str, Any]]) -> None:
+    _BACKBONE_INDEXES[str(Path(json_dir).resolve())] = files
+
+
+class IndexEntry(NamedTuple):
+    block_name: str
+    content_type: str
+    content_lang: str
+    inline_blocks: Tuple[str, ...]
+    position: int  # index inside its JSON file
+
+
+class LazyBackbone(Backbone):
+    """Two-level loader: a small per-file index first, full blocks only for what a site reaches.
+
+    The index is kept per file keyed by (mtime, size), in memory and optionally in ``index_file``,
+    so a single-site build parses only the JSON files that hold blocks reachable from the root.
+    """
+
+    INDEX_VERSION = 1
+
+    def __init__(self, json_dir: Path, block_dir: Path, index_file: Optional[Path] = None) -> None:
+        super().__init__(json_dir, block_dir)
+        self.index_file = index_file
+        self._files: Dict[str, Dict[str, Any]] = dict(_BACKBONE_INDEXES.get(str(Path(json_dir).resolve()), {}))
+        if index_file is not None and index_file.exists():
+            data = json.loads(index_file.read_text(encoding="utf-8"))
+            if data.get("version") == self.INDEX_VERSION:
+                self._files = data["files"]
+
+    def index(self) -> List[Tuple[Path, List[IndexEntry]]]:
+        result = []
+        changed = False
+        for json_file in self._json_files():
+            stat = json_file.stat()
+            signature = [stat.st_mtime_ns, stat.st_size]
+            cached = self._files.get(json_file.name)
+            if cached is None or cached["signature"] != signature:
+                entries = [
+                    [
+                        block_dict.get("block_name"),
+                        block_dict.get("content_type"),
+                        block_dict.get("content_lang"),
+                        list(block_dict.get("inline_blocks", [])),
+                        position,
+                    ]
+                    for position, block_dict in enumerate(self._read_json_file(json_file))
+                ]
+                cached = {"signature": signature, "entries": entries}
+                self._files[json_file.name] = cached
+                changed = True
+            entries_list = [
+                IndexEntry(name, content_type, lang, tuple(inline), position) for name, content_type, lang, inline, position in cached["entries"]
+            ]
+            result.append((json_file, entries_list))
+
+        if changed and self.index_file is not None:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            self.index_file.write_text(json.dumps({"version": self.INDEX_VERSION, "files": self._files}), encoding="utf-8")
+        return result
+
+    def index_data(self) -> Dict[str, Dict[str, Any]]:
+        """Raw per-file index in the ``index_file`` format, refreshed first."""
+        self.index()
+        return self._files
+
+    def snapshot_for(self, site_name: str, lang: str, root_name: str) -> BackboneSnapshot:
+        langs = ("common", lang)
+        content_types = ("common", "shared", site_name)
+        candidates: Dict[str, Tuple[Path, IndexEntry]] = {}
+        for json_file, entries in self.index():
+            for entry in entries:
+                if entry.content_lang in langs and entry.content_type in content_types:
+                    candidates[entry.block_name] = (json_file, entry)  # last one wins, as in Site
+
+        reachable: Set[str] = set()
+        stack = [root_name]
+        while stack:
+            name = stack.pop()
+            if name in reachable or name not in candidates:
+                continue
+            reachable.add(name)
+            stack.extend(candidates[name][1].inline_blocks)
+
+        wanted: Dict[Path, List[int]] = {}
+        for name in reachable:
+            json_file, entry = candidates[name]
+            wanted.setdefault(json_file, []).append(entry.position)
+
+        blocks: List[Block] = []
+        for json_file in self._json_files():
+            if json_file in wanted:
+                json_data = self._read_json_file(json_file)
+                blocks.extend(Block.from_dict(json_data[position]) for position in sorted(wanted[json_file]))
+        return BackboneSnapshot(blocks)
+
+
+_ENVIRONMENTS: Dict[Tuple[str, str], Environment] = {}
+
+
+def get_environment(block_dir: Path, cache_directory: Optional[Path] = None) -> Environment:
+    """Return the process-wide Jinja2 environment for ``block_dir``.
+
+    Compiled templates stay in the environment cache and are shared by every site and lang.
+    With ``cache_directory`` the bytecode is also stored on disk, so the next process skips compilation.
+    """
+    key = (str(Path(block_dir).resolve()), str(cache_directory or ""))
+    env = _ENVIRONMENTS.get(key)
+    if env is None:
+        bytecode_cache = None
+        if cache_directory is not None:
+            bytecode_dir = Path(cache_directory) / "jinja2"
+            bytecode_dir.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(bytecode_dir))
+        env = make_environment(FileSystemLoader(str(block_dir)), bytecode_cache)
+        _ENVIRONMENTS[key] = env
+    return env
+
+
+def make_environment(loader: BaseLoader, bytecode_cache: Optional[BytecodeCache] = None) -> Environment:
+    env = Environment(
+        loader=loader,
+        undefined=StrictUndefined,
+        autoescape=False,
+        bytecode_cache=bytecode_cache,
+    )
+    env.globals["raise"] = RuntimeError
+    return env
+
+
+def install_environment(block_dir: Path, cache_directory: Optional[Path], env: Environment) -> None:
+    """Make ``env`` (e.g. one loading precompiled modules) the environment returned for ``block_dir``."""
+    _ENVIRONMENTS[(str(Path(block_dir).resolve()), str(cache_directory or ""))] = env
+
+
+def precompile_templates(block_dir: Path, cache_directory: Optional[Path] = None) -> None:
+    env = get_environment(block_dir, cache_directory)
+    with PROFILER.phase("template compile"):
+        for template_path in sorted(Path(block_dir).glob("*/base.j2")):
+            env.get_template(f"{template_path.parent.name}/base.j2")
+
+
+class AssetBuffer:
+    """Append-only CSS/JS collector, joined only when a template prints it."""
+
+    def __init__(self) -> None:
+        self._parts: List[str] = []
+        self._joined: Optional[str] = None
+
+    @property
+    def parts(self) -> Tuple[str, ...]:
+        return tuple(self._parts)
+
+    def append(self, text: str) -> None:
+        self._parts.append(text)
+        self._joined = None
+
+    def __str__(self) -> str:
+        if self._joined is None:
+            self._joined = "".join("\n" + part for part in self._parts)
+        return self._joined
 
 
 class Jinja2Parser:
-    def __init__(self, site: Site, block_dir: Path) -> None:
+    def __init__(
+        self,
+        site: Site,
+        block_dir: Path,
+        cache_directory: Optional[Path] = None,
+        options: Optional[BuildOptions] = None,
+        assets_directory: Optional[Path] = None,
+        image_manifest: Optional[ImageManifest] = None,
+        sprite_manifest: Optional[SpriteManifest] = None,
+        jobs: int = 1,
+        fragment_cache: Optional[FragmentCache] = None,
+    ) -> None:
         self.site = site
+        self.jobs = jobs
         self.block_dir = block_dir
+        self.options = options or BuildOptions()
+        self.assets_directory = assets_directory
+        self.picture = image_manifest.picture if image_manifest is not None else no_picture
+        self.env = get_environment(block_dir, cache_directory)
+        self.fragments = fragment_cache if fragment_cache is not None else get_fragment_cache(cache_directory)
+        self._fragment_hashes: Dict[str, str] = {}
+        self._images_hash = hash_text(json.dumps(image_manifest.images, sort_keys=True)) if image_manifest is not None else ""
+        self.svg_icon = sprite_manifest.icon if sprite_manifest is not None else no_sprite_icon
+        self._sprites_hash = (
+            hash_text(json.dumps([sprite_manifest.sprite, sprite_manifest.symbols], sort_keys=True)) if sprite_manifest is not None else ""
+        )
+        self.validator = SchemaValidator(3)
         self.blocks_dict: Dict[str, str] = {}
-        self.text_css: str = ""
-        self.text_js: str = ""
-
-    def _validate_block(self, block: Block) -> None:
+        self.inline_blocks: Mapping[str, str] = MappingProxyType(self.blocks_dict)
+        self.text_css = AssetBuffer()
+        self.text_js = AssetBuffer()
+        self.weights: List[BlockWeight] = []
+        self._asset_bytes: Dict[str, Tuple[int, int]] = {}
+        self._page_assets: List[str] = []
+
+    def _validate_block(self, block: Block) -> Path:
         schema_path = self.block_dir / block.block_name / "content.schema"
-        sc = SchemaValidator(3)
-        sc.verify_json_by_path(schema_path, block.content.get_content_dict())
-        print(f"Validate {schema_path}.")
+        self.validator.verify_json_by_path(schema_path, block.content.get_content_dict(), block.content.fingerprint())
+        return schema_path
 
     def _load_assets(self, block: Block) -> None:
+        css, js = "", ""
         css_file = self.block_dir / block.block_name / "base.css"
         if css_file.exists():
-            self.text_css += "\n" + css_file.read_text(encoding="utf-8")
+            css = css_file.read_text(encoding="utf-8")
+            self.text_css.append(css)
         js_file = self.block_dir / block.block_name / "base.js"
         if js_file.exists():
-            self.text_js += "\n" + js_file.read_text(encoding="utf-8")
+            js = js_file.read_text(encoding="utf-8")
+            self.text_js.append(js)
+        self._asset_bytes[block.block_name] = (len(css.encode("utf-8")), len(js.encode("utf-8")))
+
+    def _root_assets(self) -> Dict[str, Any]:
+        if self.options.assets == "inline" and not self.options.minify_assets:
+            return {}
+        css = build_asset_text(self.text_css.parts, "css", self.options.minify_assets)
+        js = build_asset_text(self.text_js.parts, "js", self.options.minify_assets)
+        if self.options.assets == "external":
+            if self.assets_directory is None:
+                raise ValueError("External assets need an assets directory")
+            return {
+                "css_bundle": f"{self.assets_directory.name}/{write_bundle(self.assets_directory, 'css', css)}",
+                "js_bundle": f"{self.assets_directory.name}/{write_bundle(self.assets_directory, 'js', js)}",
+            }
+        return {"text_css": "\n" + css, "text_js": "\n" + js}
 
     def _get_template(self, block: Block) -> Template:
-        env = Environment(
-            loader=FileSystemLoader(str(self.block_dir)),
-            undefined=StrictUndefined,
-            autoescape=False,
-        )
-        env.globals["raise"] = RuntimeError
-        template_path = Path(block.block_name) / "base.j2"
-        return env.get_template(str(template_path))
+        template_path = f"{block.block_name}/base.j2"
+        return self.env.get_template(template_path)
 
-    def parse_block(self, block: Block) -> None:
-        self._validate_block(block)
+    def _fragment_hash(self, name: str) -> Optional[str]:
+        value = self.blocks_dict.get(name)
+        if value is None:
+            return None
+        if name not in self._fragment_hashes:
+            self._fragment_hashes[name] = hash_text(value)
+        return self._fragment_hashes[name]
+
+    def _labels(self, block: Block) -> Dict[str, str]:
+        return {"site": self.site.site_name, "lang": self.site.lang, "block": block.block_name}
 
-        print(f"Parse block: {block.block_name!r} ...", end="")
-        template = self._get_template(block)
-        self._load_assets(block)
+    def _render_block(self, block: Block) -> str:
+        labels = self._labels(block)
+        with PROFILER.phase("schema validation", **labels):
+            self._validate_block(block)
+
+        with PROFILER.phase("template compile", **labels):
+            template = self._get_template(block)
 
         template_dictionary = {
             "content": block.content,
             "site_name": self.site.site_name,
-            "inline_blocks": self.blocks_dict.copy(),
+            "inline_blocks": self.inline_blocks,
             "text_css": self.text_css,
             "text_js": self.text_js,
+            "css_bundle": "",
+            "js_bundle": "",
+            "picture": self.picture,
+            "svg_icon": self.svg_icon,
         }
-        result = template.render(**template_dictionary)
-
+        with PROFILER.phase("render", **labels):
+            if block.block_name == self.site.root_name:
+                template_dictionary.update(self._root_assets())
+                self._page_assets = [str(template_dictionary["text_css"]), str(template_dictionary["text_js"])]
+                return template.render(**template_dictionary)
+
+            info = self.fragments.template(self.env, self.block_dir / block.block_name / "base.j2")
+            if not info.cacheable:
+                return template.render(**template_dictionary)
+
+            # Everything else a block sees is the same on every page of the build.
+            site_name = self.site.site_name if "site_name" in info.variables else None
+            images_hash = self._images_hash if "picture" in info.variables else ""
+            sprites_hash = self._sprites_hash if "svg_icon" in info.variables else ""
+            context = json.dumps([self.options, images_hash, sprites_hash])
+            slot = f"{block.block_name}/{block.content_type}/{block.content_lang}"
+            key = self.fragments.slot_key(info, block.fingerprint(), context)
+            cached = self.fragments.lookup(slot, key, site_name, self._fragment_hash)
+            if cached is not None:
+                return cached
+
+            reads = InlineReads(self.blocks_dict)
+            template_dictionary["inline_blocks"] = reads
+            result = template.render(**template_dictionary)
+            self.fragments.store(slot, key, site_name, {name: self._fragment_hash(name) for name in reads.reads}, result)
+            return result
+
+    def _weigh(self, block: Block, result: str) -> BlockWeight:
+        """Bytes and requests a block adds itself: its markup minus the fragments (and page CSS/JS) it inlines."""
+        own = result
+        inlined = [
+            fragment
+            for name, fragment in self.blocks_dict.items()
+            if name in block.inline_blocks or name.rsplit("_part", 1)[0] in block.inline_blocks
+        ]
+        if block.block_name == self.site.root_name:
+            inlined += self._page_assets
+        for fragment in inlined:
+            # Templates usually insert fragments through ``| indent``; anything not found stays with the parent.
+            for text in (fragment, do_indent(fragment)):
+                if text and text in own:
+                    own = own.replace(text, "", 1)
+                    break
+        css, js = self._asset_bytes.get(block.block_name, (0, 0))
+        return BlockWeight(block.block_name, len(own.encode("utf-8")), css, js, count_requests(own))
+
+    def _store_block(self, block: Block, result: str) -> None:
+        self.weights.append(self._weigh(block, result))
         self.blocks_dict.update(self.split_content(block.block_name, result))
-        print(" [OK]")
+        print(f"Validate {self.block_dir / block.block_name / 'content.schema'}.")
+        print(f"Parse block: {block.block_name!r} ... [OK]")
+
+    def parse_block(self, block: Block) -> None:
+        with PROFILER.phase("asset load", **self._labels(block)):
+            self._load_assets(block)
+        self._store_block(block, self._render_block(block))
 
     def split_content(self, block_name: str, data: str) -> Dict[str, str]:
         splited_data = data.split("<!-- SPLIT -->")
@@ -213,20 +626,24 @@ class Jinja2Parser:
         return result
 
     def parse_site(self) -> str:
+        if self.jobs <= 1:
+            for block in self.site.blocks:
+                self.parse_block(block)
+            self.fragments.save()
+            return self.blocks_dict[self.site.root_name]
+
+        # CSS/JS are collected in dependency order, so output matches the serial renderer.
         for block in self.site.blocks:
-            self.parse_block(block)
+            with PROFILER.phase("asset load", **self._labels(block)):
+                self._load_assets(block)
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            for level in self.site.levels():
+                for block, result in zip(level, pool.map(self._render_block, level)):
+                    self._store_block(block, result)
+        self.fragments.save()
         return self.blocks_dict[self.site.root_name]
 
 
-def get_sites(site_path: str = "generator/sites.txt") -> List[Dict[str, str]]:
-    sites: List[Dict[str, str]] = []
-    path = Path(site_path)
-    for item in path.read_text(encoding="utf-8").splitlines():
-        site_name, lang = item.split(":")
-        sites.append({"site_name": site_name, "lang": lang})
-    return sites
-
-
 ROOT_NAME = "aa_entrypoint"
 
 
@@ -236,24 +653,75 @@ def main(
     sites_directory: Path,
     site_name: str,
     lang: str,
-) -> None:
+    backbone: Optional[BackboneSnapshot] = None,
+    cache_directory: Optional[Path] = None,
+    manifest: Optional[BuildManifest] = None,
+    options: Optional[BuildOptions] = None,
+    block_jobs: int = 1,
+    budget: Optional[BudgetReport] = None,
+) -> bool:
+    """Render one site/lang page. Returns False when the manifest shows it is up to date.
+
+    ``block_jobs`` > 1 renders independent blocks of the page on threads; the output is identical.
+    Rendering is CPU-bound and holds the GIL, so the threads only overlap template and cache I/O.
+    """
     sites = get_sites()
 
     if {"site_name": site_name, "lang": lang} not in sites:
         msg = f"Site {site_name!r} with lang {lang!r} is not supported!"
         raise ValueError(msg)
 
-    backcone = Backbone(json_directory, block_directory)
-    blocks = backcone.collect_blocks()
+    if backbone is None:
+        index_file = cache_directory / "backbone_index.json" if cache_directory is not None else None
+        with PROFILER.phase("backbone load", site=site_name, lang=lang):
+            backbone = LazyBackbone(json_directory, block_directory, index_file).snapshot_for(site_name, lang, ROOT_NAME)
+    options = options or BuildOptions()
 
     site = Site(site_name, lang, root_name=ROOT_NAME)  # type: ignore
-    site.setup_blocks(blocks)
-
-    parser = Jinja2Parser(site=site, block_dir=block_directory)
-    file_content = parser.parse_site()
+    site.setup_blocks(backbone)
 
     site_file = sites_directory / f"{site_name}_{lang}.html"
-    site_file.write_text(file_content)
+    inputs = manifest.collect_inputs(site.blocks, block_directory) if manifest is not None else {}
+    inputs["options"] = json.dumps(options._asdict(), sort_keys=True)
+    image_manifest = ImageManifest(sites_directory) if options.images else None
+    sprite_manifest = SpriteManifest(sites_directory) if options.svg_sprite else None
+    if sprite_manifest is not None and sprite_manifest.path.exists():
+        inputs["sprites"] = hashlib.sha256(sprite_manifest.path.read_bytes()).hexdigest()
+    if manifest is not None and options.resource_hints:
+        inputs["resource_hints"] = manifest.file_hash(Path(options.resource_hints))
+    if image_manifest is not None and image_manifest.path.exists():
+        inputs["images"] = hashlib.sha256(image_manifest.path.read_bytes()).hexdigest()
+    # A page without recorded weights is rendered so its budget can be checked.
+    unweighed = budget is not None and budget.entry(site_file.name) is None
+    if manifest is not None and not unweighed and manifest.is_fresh(site_file, inputs):
+        print(f"Skip {site_file}: inputs unchanged.")
+        return False
+
+    parser = Jinja2Parser(
+        site=site,
+        block_dir=block_directory,
+        cache_directory=cache_directory,
+        options=options,
+        assets_directory=sites_directory / "assets",
+        image_manifest=image_manifest,
+        sprite_manifest=sprite_manifest,
+        jobs=block_jobs,
+    )
+    file_content = parser.parse_site()
+    if options.purge_css or options.critical_css:
+        with PROFILER.phase("css optimize", site=site_name, lang=lang):
+            file_content = get_css_optimizer(cache_directory).optimize(file_content, purge=options.purge_css, critical=options.critical_css)
+    if options.resource_hints:
+        with PROFILER.phase("resource hints", site=site_name, lang=lang):
+            file_content = add_resource_hints(file_content, HintConfig.load(Path(options.resource_hints), site_name))
+
+    with PROFILER.phase("file write", site=site_name, lang=lang):
+        write_page(site_file, file_content, minify=options.minify_html, compress=options.compress)
+    if manifest is not None:
+        manifest.record(site_file, inputs)
+    if budget is not None:
+        budget.record(site_file, parser.weights)
+    return True
 
 
 if __name__ == "__main__":  # pragma: no cover
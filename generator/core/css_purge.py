@@ -0,0 +1,422 @@
+from __future__ import annotations
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+import hashlib
+import json
+import re
+
+# Classes toggled by block JS at runtime; their rules are always kept.
+CSS_ALLOWLIST = frozenset({"active", "open", "copied"})
+# Markup bytes after <body> treated as above the fold when splitting out critical CSS.
+CRITICAL_BYTES = 14 * 1024
+# Bump when the rewrite changes so cached results of older versions are not reused.
+CSS_CACHE_VERSION = 2
+# At-rules whose block holds ordinary rules that can be pruned one by one.
+_GROUPING_RULES = ("@media", "@supports", "@container", "@layer")
+
+_STYLE = re.compile(r"(<style\b[^>]*>)(.*?)(</style\s*>)", re.S | re.I)
+_HEAD_END = re.compile(r"</head\s*>", re.I)
+_BODY_END = re.compile(r"</body\s*>", re.I)
+_WORD = re.compile(r"-?[_a-zA-Z][\w-]*")
+_SELECTOR_NAME = re.compile(r"([.#])(-?[_a-zA-Z][\w-]*)")
+_PSEUDO = re.compile(r"::?[\w-]+")
+_TYPE = re.compile(r"(?:^|[\s>+~])([a-zA-Z][\w-]*|\*)")
+# Pseudo-elements that may still be written with a single colon.
+_LEGACY_PSEUDO_ELEMENTS = frozenset({":before", ":after", ":first-line", ":first-letter"})
+
+Specificity = Tuple[int, int, int]
+
+
+class CssNode(NamedTuple):
+    prelude: str  # selector list or at-rule header, empty for comments/whitespace
+    text: str  # the node exactly as written, including leading whitespace
+    children: Tuple["CssNode", ...]  # rules of a grouping at-rule
+
+
+def _skip_string(text: str, index: int) -> int:
+    quote = text[index]
+    index += 1
+    while index < len(text) and text[index] != quote:
+        index += 2 if text[index] == "\\" else 1
+    return index + 1
+
+
+def _block_end(text: str, index: int) -> int:
+    """Index after the ``}`` closing the block opened just before ``index``."""
+    depth = 1
+    while index < len(text) and depth:
+        char = text[index]
+        if char in "'\"":
+            index = _skip_string(text, index)
+            continue
+        if text.startswith("/*", index):
+            end = text.find("*/", index + 2)
+            index = len(text) if end == -1 else end + 2
+            continue
+        depth += {"{": 1, "}": -1}.get(char, 0)
+        index += 1
+    return index
+
+
+def parse_css(text: str) -> List[CssNode]:
+    nodes: List[CssNode] = []
+    index = 0
+    while index < len(text):
+        start = index
+        while True:  # leading whitespace and comments belong to the next node
+            while index < len(text) and text[index].isspace():
+                index += 1
+            if not text.startswith("/*", index):
+                break
+            end = text.find("*/", index + 2)
+            index = len(text) if end == -1 else end + 2
+        if index >= len(text):
+            nodes.append(CssNode("", text[start:], ()))
+            break
+
+        prelude_start = index
+        while index < len(text) and text[index] not in "{;}":
+            index = _skip_string(text, index) if text[index] in "'\"" else index + 1
+        prelude = text[prelude_start:index].strip()
+        if index >= len(text) or text[index] in ";}":
+            index = min(index + 1, len(text))
+            nodes.append(CssNode(prelude, text[start:index], ()))
+            continue
+
+        body_start = index + 1
+        index = _block_end(text, body_start)
+        children: Tuple[CssNode, ...] = ()
+        if prelude.lower().startswith(_GROUPING_RULES):
+            children = tuple(parse_css(text[body_start : index - 1]))
+        nodes.append(CssNode(prelude, text[start:index], children))
+    return nodes
+
+
+def _split_selectors(prelude: str) -> List[str]:
+    selectors: List[str] = []
+    depth = 0
+    current = ""
+    index = 0
+    while index < len(prelude):
+        char = prelude[index]
+        if char in "'\"":
+            end = _skip_string(prelude, index)
+            current += prelude[index:end]
+            index = end
+            continue
+        depth += {"(": 1, "[": 1, ")": -1, "]": -1}.get(char, 0)
+        if char == "," and depth == 0:
+            selectors.append(current.strip())
+            current = ""
+        else:
+            current += char
+        index += 1
+    selectors.append(current.strip())
+    return [selector for selector in selectors if selector]
+
+
+def _without_attributes(selector: str) -> str:
+    return re.sub(r"\[[^\]]*\]", "", selector)
+
+
+def selector_names(selector: str) -> Set[str]:
+    """Class and id names a selector requires."""
+    # Arguments of :not(), :is(), :has(), ... are ignored, which can only keep more rules.
+    plain = re.sub(r":[\w-]+\([^)]*\)", "", _without_attributes(selector))
+    return {name for _, name in _SELECTOR_NAME.findall(plain)}
+
+
+def specificity(selector: str) -> Optional[Specificity]:
+    """(ids, classes/attributes/pseudo-classes, types/pseudo-elements); None when a functional
+    pseudo-class such as ``:not()`` makes it depend on the arguments."""
+    if re.search(r":[\w-]+\(", selector):
+        return None
+    plain = re.sub(r"\[[^\]]*\]", "", selector)
+    attributes = len(re.findall(r"\[[^\]]*\]", selector))
+    pseudo = _PSEUDO.findall(plain)
+    elements = sum(1 for name in pseudo if name.startswith("::") or name in _LEGACY_PSEUDO_ELEMENTS)
+    plain = _PSEUDO.sub("", plain)
+    names = _SELECTOR_NAME.findall(plain)
+    ids = sum(1 for kind, _ in names if kind == "#")
+    types = sum(1 for name in _TYPE.findall(_SELECTOR_NAME.sub("", plain)) if name != "*")
+    return ids, len(names) - ids + attributes + len(pseudo) - elements, types + elements
+
+
+def strip_pseudo(selector: str) -> str:
+    """Drop pseudo-classes/elements so the selector can be matched against static markup."""
+    result = ""
+    index = 0
+    depth = 0
+    while index < len(selector):
+        char = selector[index]
+        if char in "'\"":
+            end = _skip_string(selector, index)
+            result += selector[index:end]
+            index = end
+            continue
+        depth += {"[": 1, "]": -1}.get(char, 0)
+        if char == ":" and depth == 0:
+            index += 1
+            while index < len(selector) and (selector[index] == ":" or selector[index] == "-" or selector[index].isalnum()):
+                index += 1
+            if index < len(selector) and selector[index] == "(":
+                parens = 0
+                while index < len(selector):
+                    parens += {"(": 1, ")": -1}.get(selector[index], 0)
+                    index += 1
+                    if parens == 0:
+                        break
+            continue
+        result += char
+        index += 1
+
+    tokens = re.sub(r"\s*([>+~])\s*", r" \1 ", result).split()
+    compounds: List[str] = []
+    for token in tokens:
+        if token in (">", "+", "~") and (not compounds or compounds[-1] in (">", "+", "~")):
+            compounds.append("*")
+        compounds.append(token)
+    if not compounds or compounds[-1] in (">", "+", "~"):
+        compounds.append("*")
+    return " ".join(compounds)
+
+
+class PageTokens(HTMLParser):
+    """Class names, ids and script words of a page: everything a selector may refer to."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.names: Set[str] = set()
+        self._in_script = False
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        for name, value in attrs:
+            if name == "class" and value:
+                self.names.update(value.split())
+            elif name == "id" and value:
+                self.names.add(value.strip())
+        self._in_script = tag == "script"
+
+    def handle_endtag(self, tag: str) -> None:
+        self._in_script = False
+
+    def handle_data(self, data: str) -> None:
+        if self._in_script:
+            # classList.add('x'), innerHTML templates, querySelector('.x'), ...
+            self.names.update(_WORD.findall(data))
+
+
+def page_tokens(html: str, allowlist: FrozenSet[str] = CSS_ALLOWLIST) -> Set[str]:
+    parser = PageTokens()
+    parser.feed(html)
+    parser.close()
+    return parser.names | set(allowlist)
+
+
+def _used(prelude: str, tokens: Set[str]) -> bool:
+    # A selector is unused only if it names a class or id that appears nowhere on the page.
+    return any("\\" in selector or selector_names(selector) <= tokens for selector in _split_selectors(prelude))
+
+
+def purge_nodes(nodes: List[CssNode], tokens: Set[str]) -> List[CssNode]:
+    kept: List[CssNode] = []
+    for node in nodes:
+        if node.children:
+            children = purge_nodes(list(node.children), tokens)
+            if any(child.prelude for child in children):
+                kept.append(_rebuild(node, children))
+        elif not node.prelude or node.prelude.startswith("@") or _used(node.prelude, tokens):
+            kept.append(node)
+    return kept
+
+
+def _rebuild(node: CssNode, children: List[CssNode]) -> CssNode:
+    body_start = node.text.index("{", node.text.index(node.prelude)) + 1
+    text = node.text[:body_start] + "".join(child.text for child in children) + node.text[node.text.rindex("}") :]
+    return CssNode(node.prelude, text, tuple(children))
+
+
+class _Fold:
+    """Elements of a page that start within ``CRITICAL_BYTES`` of ``<body>``."""
+
+    def __init__(self, html: str, fold_bytes: int) -> None:
+        from bs4 import BeautifulSoup
+
+        self.soup = BeautifulSoup(html, "html.parser")
+        line_starts = [0] + [match.end() for match in re.finditer("\n", html)]
+        body = self.soup.find("body")
+        limit = (line_starts[body.sourceline - 1] + (body.sourcepos or 0) if body is not None and body.sourceline else 0) + fold_bytes
+        self.visible: Set[int] = set()
+        for element in self.soup.find_all(True):
+            if element.sourceline is not None and line_starts[element.sourceline - 1] + (element.sourcepos or 0) <= limit:
+                self.visible.add(id(element))
+
+    def matches(self, prelude: str) -> Optional[Dict[int, Optional[Specificity]]]:
+        """Elements a rule applies to with the highest specificity it has for each; None when
+        soupsieve cannot evaluate one of its selectors."""
+        matched: Dict[int, Optional[Specificity]] = {}
+        for selector in _split_selectors(prelude):
+            try:
+                elements = self.soup.select(strip_pseudo(selector))
+            except Exception:
+                return None
+            weight = specificity(selector)
+            for element in elements:
+                key = id(element)
+                previous = matched.get(key, weight)
+                matched[key] = None if previous is None or weight is None else max(previous, weight)
+        return matched
+
+    def critical(self, prelude: str) -> bool:
+        matched = self.matches(prelude)
+        return matched is None or any(key in self.visible for key in matched)
+
+
+def _rules(nodes: List[CssNode]) -> List[CssNode]:
+    rules: List[CssNode] = []
+    for node in nodes:
+        if node.children:
+            rules += _rules(list(node.children))
+        elif node.prelude and not node.prelude.startswith("@"):
+            rules.append(node)
+    return rules
+
+
+def critical_rules(nodes: List[CssNode], fold: _Fold) -> Set[int]:
+    """Ids of the rules that stay in ``<head>``.
+
+    Besides above-the-fold rules this keeps every rule a later kept rule could tie with: same
+    element, same specificity. Moved after those, it would win the cascade it lost in the source.
+    """
+    kept: Set[int] = set()
+    later: Dict[int, Set[Optional[Specificity]]] = {}  # element -> specificities of later kept rules
+    later_unknown = False  # a later kept rule soupsieve cannot evaluate may match anything
+    for node in reversed(_rules(nodes)):
+        matched = fold.matches(node.prelude)
+        if matched is None or any(key in fold.visible for key in matched):
+            keep = True
+        else:
+            keep = later_unknown and bool(matched)
+            for key, weight in matched.items():
+                weights = later.get(key, set())
+                if weight is None and weights or weight in weights or None in weights:
+                    keep = True
+                    break
+        if not keep:
+            continue
+        kept.add(id(node))
+        if matched is None:
+            later_unknown = True
+        else:
+            for key, weight in matched.items():
+                later.setdefault(key, set()).add(weight)
+    return kept
+
+
+def split_critical(nodes: List[CssNode], fold: _Fold, kept: Optional[Set[int]] = None) -> Tuple[List[CssNode], List[CssNode]]:
+    if kept is None:
+        kept = critical_rules(nodes, fold)
+    critical: List[CssNode] = []
+    rest: List[CssNode] = []
+    for node in nodes:
+        if node.children:
+            above, below = split_critical(list(node.children), fold, kept)
+            if any(child.prelude for child in above):
+                critical.append(_rebuild(node, above))
+            if any(child.prelude for child in below):
+                rest.append(_rebuild(node, below))
+        elif not node.prelude or node.prelude.startswith("@") or id(node) in kept:
+            critical.append(node)
+        else:
+            rest.append(node)
+    return critical, rest
+
+
+def _text(nodes: List[CssNode]) -> str:
+    return "".join(node.text for node in nodes)
+
+
+class CssOptimizer:
+    """Per-page unused-CSS removal and critical-CSS split, cached by (CSS hash, HTML hash)."""
+
+    def __init__(self, cache_directory: Optional[Path] = None, allowlist: FrozenSet[str] = CSS_ALLOWLIST) -> None:
+        self.directory = cache_directory / "css" if cache_directory is not None else None
+        self.allowlist = allowlist
+        self._results: Dict[str, Tuple[str, str]] = {}
+
+    def _cached(self, key: str) -> Optional[Tuple[str, str]]:
+        if key in self._results:
+            return self._results[key]
+        if self.directory is not None and (self.directory / f"{key}.json").exists():
+            kept, rest = json.loads((self.directory / f"{key}.json").read_text(encoding="utf-8"))
+            self._results[key] = (kept, rest)
+            return kept, rest
+        return None
+
+    def _store(self, key: str, result: Tuple[str, str]) -> None:
+        self._results[key] = result
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            (self.directory / f"{key}.json").write_text(json.dumps(result, ensure_ascii=False), encoding="utf-8")
+
+    def optimize(self, html: str, purge: bool = True, critical: bool = False) -> str:
+        """Rewrite every ``<style>`` of ``html``; with ``critical`` head styles keep only above-the-fold
+        rules (and the rules they could tie with) and the rest moves to a ``<style>`` at the end of ``<body>``."""
+        if not purge and not critical:
+            return html
+        html_hash = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        head_end = _HEAD_END.search(html)
+        styles = list(_STYLE.finditer(html))
+        splits = [critical and head_end is not None and match.start() < head_end.start() for match in styles]
+        keys = []
+        for match, split in zip(styles, splits):
+            css_hash = hashlib.sha256(match.group(2).encode("utf-8")).hexdigest()
+            parts = [str(CSS_CACHE_VERSION), css_hash, html_hash, str(purge), str(split), str(CRITICAL_BYTES)]
+            keys.append(hashlib.sha256(json.dumps(parts + sorted(self.allowlist)).encode("utf-8")).hexdigest())
+        cached = [self._cached(key) for key in keys]
+        results = [result for result in cached if result is not None]
+        if len(results) < len(styles):
+            results = self._optimize_styles(html, [match.group(2) for match in styles], splits, purge)
+            for key, result in zip(keys, results):
+                self._store(key, result)
+
+        pieces: List[str] = []
+        deferred: List[str] = []
+        position = 0
+        for match, (kept, deferred_css) in zip(styles, results):
+            pieces.append(html[position : match.start()] + match.group(1) + kept + match.group(3))
+            position = match.end()
+            if deferred_css.strip():
+                deferred.append(deferred_css)
+        html = "".join(pieces) + html[position:]
+        if deferred:
+            body_end = list(_BODY_END.finditer(html))
+            position = body_end[-1].start() if body_end else len(html)
+            html = html[:position] + "<style>" + "\n".join(deferred) + "\n  </style>\n" + html[position:]
+        return html
+
+    def _optimize_styles(self, html: str, styles: List[str], splits: List[bool], purge: bool) -> List[Tuple[str, str]]:
+        """(kept, deferred) CSS of every style; the cascade is checked across all head styles at once."""
+        tokens = page_tokens(html, self.allowlist) if purge else set()
+        parsed = [purge_nodes(parse_css(css), tokens) if purge else parse_css(css) for css in styles]
+        if not any(splits):
+            return [(_text(nodes), "") for nodes in parsed]
+        fold = _Fold(html, CRITICAL_BYTES)
+        kept = critical_rules([node for nodes, split in zip(parsed, splits) if split for node in nodes], fold)
+        results = []
+        for nodes, split in zip(parsed, splits):
+            above, below = split_critical(nodes, fold, kept) if split else (nodes, [])
+            results.append((_text(above), _text(below)))
+        return results
+
+
+_OPTIMIZERS: Dict[Optional[str], CssOptimizer] = {}
+
+
+def get_css_optimizer(cache_directory: Optional[Path] = None) -> CssOptimizer:
+    """Shared optimizer per process: results in memory, or persisted under ``cache_directory/css``."""
+    key = str(cache_directory) if cache_directory is not None else None
+    if key not in _OPTIMIZERS:
+        _OPTIMIZERS[key] = CssOptimizer(cache_directory)
+    return _OPTIMIZERS[key]
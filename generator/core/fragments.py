@@ -0,0 +1,182 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Mapping, Optional, Tuple
+import hashlib
+import json
+import os
+import threading
+
+import jinja2
+from jinja2 import Environment, meta
+
+FRAGMENT_CACHE_VERSION = 1
+# Variants kept per backbone entry (one per site for blocks that read ``site_name``).
+MAX_VARIANTS = 64
+# Templates reading these depend on the whole page and are never cached.
+PAGE_VARIABLES = frozenset({"text_css", "text_js", "css_bundle", "js_bundle"})
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class InlineReads(Mapping[str, str]):
+    """Read-only view of the rendered fragments that records which ones a template looked up."""
+
+    def __init__(self, fragments: Mapping[str, str]) -> None:
+        self._fragments = fragments
+        self.reads: Dict[str, Optional[str]] = {}
+
+    def __getitem__(self, name: str) -> str:
+        value = self._fragments.get(name)
+        self.reads[name] = value
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        # Iterating exposes every fragment, so all of them become inputs.
+        self.reads.update(self._fragments)
+        return iter(self._fragments)
+
+    def __len__(self) -> int:
+        self.reads.update(self._fragments)
+        return len(self._fragments)
+
+
+class TemplateInfo:
+    """Hash and top-level variables of a block template, refreshed when the file changes."""
+
+    def __init__(self, signature: Tuple[int, int], digest: str, variables: FrozenSet[str]) -> None:
+        self.signature = signature
+        self.digest = digest
+        self.variables = variables
+
+    @property
+    def cacheable(self) -> bool:
+        return not self.variables & PAGE_VARIABLES
+
+
+class FragmentCache:
+    """Rendered block fragments shared between the pages of one build.
+
+    A backbone entry (block, content_type, content_lang) owns one slot. The slot key hashes the
+    template, the block content and the build options; a change to any of them evicts every
+    fragment of the slot. Each variant also records the ``site_name`` it was rendered for (when the
+    template reads it) and the hash of every ``inline_blocks`` fragment it read, and is reused only
+    when those match. With a ``directory`` slots are also kept on disk between builds.
+    """
+
+    def __init__(self, directory: Optional[Path] = None) -> None:
+        self.directory = directory
+        self._slots: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Dict[str, bool] = {}
+        self._templates: Dict[str, TemplateInfo] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return sum(len(slot["variants"]) for slot in self._slots.values())
+
+    def template(self, env: Environment, template_path: Path) -> TemplateInfo:
+        key = str(template_path)
+        stat = template_path.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        info = self._templates.get(key)
+        if info is not None and info.signature == signature:
+            return info
+        source = template_path.read_text(encoding="utf-8")
+        digest = hash_text(source)
+        if info is None or info.digest != digest:
+            variables = frozenset(meta.find_undeclared_variables(env.parse(source)))
+        else:
+            variables = info.variables
+        info = TemplateInfo(signature, digest, variables)
+        self._templates[key] = info
+        return info
+
+    def seed(self, template_path: Path, info: TemplateInfo) -> None:
+        self._templates[str(template_path)] = info
+
+    @staticmethod
+    def slot_key(template: TemplateInfo, content_hash: str, context: str) -> str:
+        parts = [FRAGMENT_CACHE_VERSION, jinja2.__version__, template.digest, content_hash, context]
+        return hash_text(json.dumps(parts))
+
+    def _slot_file(self, slot: str) -> Optional[Path]:
+        if self.directory is None:
+            return None
+        return self.directory / f"{hash_text(slot)[:32]}.json"
+
+    def _slot(self, slot: str) -> Optional[Dict[str, Any]]:
+        record = self._slots.get(slot)
+        if record is not None:
+            return record
+        path = self._slot_file(slot)
+        if path is None or not path.exists():
+            return None
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            return None
+        if not isinstance(record, dict) or record.get("slot") != slot:
+            return None
+        self._slots[slot] = record
+        return record
+
+    def lookup(self, slot: str, key: str, site_name: Optional[str], fragment_hash: Callable[[str], Optional[str]]) -> Optional[str]:
+        with self._lock:
+            record = self._slot(slot)
+            if record is not None and record["key"] == key:
+                for variant in record["variants"]:
+                    if variant["site"] == site_name and all(fragment_hash(name) == digest for name, digest in variant["reads"].items()):
+                        self.hits += 1
+                        html: str = variant["html"]
+                        return html
+            self.misses += 1
+            return None
+
+    def store(self, slot: str, key: str, site_name: Optional[str], reads: Dict[str, Optional[str]], html: str) -> None:
+        variant = {"site": site_name, "reads": reads, "html": html}
+        with self._lock:
+            record = self._slot(slot)
+            if record is None or record["key"] != key:
+                record = {"slot": slot, "key": key, "variants": []}
+                self._slots[slot] = record
+            variants: List[Dict[str, Any]] = [v for v in record["variants"] if (v["site"], v["reads"]) != (site_name, reads)]
+            record["variants"] = [variant] + variants[: MAX_VARIANTS - 1]
+            self._dirty[slot] = True
+
+    def save(self) -> None:
+        """Write changed slots to ``directory``; a no-op for in-memory caches."""
+        with self._lock:
+            dirty, self._dirty = list(self._dirty), {}
+            for slot in dirty:
+                path = self._slot_file(slot)
+                if path is None:
+                    continue
+                path.parent.mkdir(parents=True, exist_ok=True)
+                temporary = path.with_suffix(f".{os.getpid()}.tmp")
+                temporary.write_text(json.dumps(self._slots[slot], ensure_ascii=False, sort_keys=True), encoding="utf-8")
+                os.replace(temporary, path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slots.clear()
+            self._dirty.clear()
+            self._templates.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_CACHES: Dict[Optional[str], FragmentCache] = {}
+
+
+def get_fragment_cache(cache_directory: Optional[Path] = None) -> FragmentCache:
+    """Shared cache per process: in memory, or persisted under ``cache_directory/fragments``."""
+    key = str(cache_directory) if cache_directory is not None else None
+    if key not in _CACHES:
+        directory = cache_directory / "fragments" if cache_directory is not None else None
+        _CACHES[key] = FragmentCache(directory)
+    return _CACHES[key]
@@ -0,0 +1,250 @@
+"""Resource hints (preconnect, dns-prefetch, preload) derived from a rendered page.
+
+Only images the HTML parser cannot discover are preloaded: CSS ``background-image``s of elements in
+the first viewport. A parser-visible ``<img>`` is already found by the preload scanner.
+"""
+
+from __future__ import annotations
+from html import escape
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit
+import json
+import re
+
+from generator.core.css_purge import CRITICAL_BYTES, CssNode, parse_css, selector_names
+
+# Browsers hold few speculative connections; past this, hints fall back to dns-prefetch.
+MAX_PRECONNECT = 4
+# <link rel> values the browser fetches on its own (canonical, alternate, ... are never fetched).
+FETCHED_LINKS = frozenset({"stylesheet", "icon", "shortcut", "apple-touch-icon", "manifest", "preload", "modulepreload"})
+HINT_RELS = frozenset({"preconnect", "dns-prefetch"})
+SCRIPT_TYPES = frozenset({"", "text/javascript", "application/javascript", "module"})
+# Script URLs written in inline JS, e.g. an embed or tag loader injected later.
+_SCRIPT_URL = re.compile(r"""["'`](https?://[^"'`\s/?#]+)/[^"'`\s?#]*\.js\b""")
+_CHARSET = re.compile(r"^([ \t]*)<meta\s+charset\b[^>]*>[ \t]*\n?", re.I | re.M)
+_HEAD = re.compile(r"<head\b[^>]*>[ \t]*\n?", re.I)
+_FIXED = re.compile(r"position\s*:\s*fixed\b", re.I)
+_BACKGROUND_URL = re.compile(r"""background(?:-image)?\s*:[^;}]*?url\(\s*(["']?)([^"')]+)\1\s*\)""", re.I)
+
+
+def origin_of(url: str) -> Optional[str]:
+    """``scheme://host[:port]`` of an absolute http(s) URL (protocol-relative ones count as https)."""
+    if url.startswith("//"):
+        url = "https:" + url
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc.lower()}"
+
+
+class HintConfig(NamedTuple):
+    """Settings of one site: the top level of the hints file merged with its ``sites`` entry.
+
+    ``origin`` is where the pages are served from and is never hinted. ``preconnect`` and
+    ``dns_prefetch`` add origins the page alone does not reveal (e.g. a script that is injected
+    without a visible URL); ``exclude`` drops origins that must not be contacted early.
+    """
+
+    origin: str = ""
+    preconnect: Tuple[str, ...] = ()
+    dns_prefetch: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()
+    max_preconnect: int = MAX_PRECONNECT
+    preload_images: int = 2
+    enabled: bool = True
+
+    @classmethod
+    def load(cls, path: Path, site_name: str) -> "HintConfig":
+        data: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8")) if path.is_file() else {}
+        settings = {key: value for key, value in data.items() if key != "sites"}
+        settings.update(data.get("sites", {}).get(site_name, {}))
+        unknown = set(settings) - set(cls._fields)
+        if unknown:
+            raise ValueError(f"{path}: unknown resource hint setting(s) {', '.join(sorted(unknown))}")
+        values: Dict[str, Any] = {key: tuple(value) if isinstance(value, list) else value for key, value in settings.items()}
+        return cls(**values)
+
+
+class PageResources(HTMLParser):
+    """Third-party origins, inline CSS, first-viewport class/id names and existing hints of one page.
+
+    Origins of elements the browser fetches while parsing are preconnect candidates; origins of
+    ``.js`` URLs that only appear inside inline scripts (loaded later, often after consent) get
+    dns-prefetch.
+    Elements inside ``<noscript>`` are ignored.
+    """
+
+    def __init__(self, html: str, fold_bytes: int = CRITICAL_BYTES) -> None:
+        super().__init__(convert_charrefs=True)
+        self.fetched: List[str] = []
+        self.scripted: List[str] = []
+        self.styles: List[str] = []
+        self.names: Set[str] = set()
+        self.fold_names: Set[str] = set()
+        self.images: Set[str] = set()  # <img> sources the preload scanner finds on its own
+        self.hinted: Set[str] = set()
+        self.preloaded: Set[str] = set()
+        self._line_starts = [0] + [match.end() for match in re.finditer("\n", html)]
+        self._fold: Optional[int] = None
+        self._fold_bytes = fold_bytes
+        self._noscript = 0
+        self._script = False
+        self._style = False
+        self.feed(html)
+        self.close()
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self._line_starts[line - 1] + column
+
+    def _fetch(self, url: Optional[str]) -> None:
+        origin = origin_of(url or "")
+        if origin is not None:
+            self.fetched.append(origin)
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = {name: value or "" for name, value in attrs}
+        if tag == "noscript":
+            self._noscript += 1
+        elif tag == "body":
+            self._fold = self._offset() + self._fold_bytes
+        if self._noscript:
+            return
+        names = attributes.get("class", "").split() + attributes.get("id", "").split()
+        self.names.update(names)
+        if self._fold is not None and self._offset() <= self._fold:
+            self.fold_names.update(names)
+        self._style = tag == "style"
+        if tag == "script":
+            self._script = "src" not in attributes and attributes.get("type", "").lower() in SCRIPT_TYPES
+            self._fetch(attributes.get("src"))
+        elif tag == "link":
+            rels = set(attributes.get("rel", "").lower().split())
+            href = attributes.get("href", "")
+            if rels & HINT_RELS:
+                self.hinted.add(origin_of(href) or href)
+            if "preload" in rels:
+                self.preloaded.add(href)
+            if rels & FETCHED_LINKS:
+                self._fetch(href)
+        elif tag in ("img", "iframe", "video", "audio", "source", "embed"):
+            self._fetch(attributes.get("src"))
+            if tag == "img":
+                self.images.add(attributes.get("src", ""))
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag == "script":
+            self._script = False
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "noscript" and self._noscript:
+            self._noscript -= 1
+        elif tag == "script":
+            self._script = False
+        elif tag == "style":
+            self._style = False
+
+    def handle_data(self, data: str) -> None:
+        if self._noscript:
+            return
+        if self._script:
+            self.scripted.extend(match.group(1).lower() for match in _SCRIPT_URL.finditer(data))
+        elif self._style:
+            self.styles.append(data)
+
+
+def _rules(nodes: List[CssNode], media: str = "") -> List[Tuple[CssNode, str]]:
+    """Style rules with the condition of their enclosing ``@media`` rules."""
+    rules: List[Tuple[CssNode, str]] = []
+    for node in nodes:
+        if node.children:
+            condition = media
+            if node.prelude.lower().startswith("@media"):
+                query = node.prelude[len("@media") :].strip()
+                condition = f"{media} and {query}" if media else query
+            rules += _rules(list(node.children), condition)
+        elif node.prelude and not node.prelude.startswith("@"):
+            rules.append((node, media))
+    return rules
+
+
+def _matching(prelude: str, names: Set[str]) -> List[Set[str]]:
+    """Class/id names of the selectors of ``prelude`` that only need names in ``names``."""
+    selectors = [selector_names(selector) for selector in prelude.split(",")]
+    return [required for required in selectors if required and required <= names]
+
+
+def first_viewport_names(page: PageResources, rules: List[Tuple[CssNode, str]]) -> Set[str]:
+    """Class/id names of elements in the first viewport: near the top of ``<body>``, or ``position: fixed``."""
+    names = set(page.fold_names)
+    for node, _media in rules:
+        if _FIXED.search(node.text):
+            for required in _matching(node.prelude, page.names):
+                names |= required
+    return names
+
+
+def background_images(rules: List[Tuple[CssNode, str]], names: Set[str]) -> List[Tuple[str, str]]:
+    """(url, media) of background images set by rules whose selectors name only classes/ids in ``names``.
+
+    ``media`` is the condition of the enclosing ``@media`` rules, so a preload fetches the image only
+    where the CSS would use it.
+    """
+    found: List[Tuple[str, str]] = []
+    for node, media in rules:
+        if _matching(node.prelude, names):
+            found += [(match.group(2).strip(), media) for match in _BACKGROUND_URL.finditer(node.text)]
+    return found
+
+
+def collect_hints(html: str, config: HintConfig) -> List[str]:
+    """``<link>`` elements for ``html``, skipping origins and images that already have a hint."""
+    page = PageResources(html)
+    skipped = {origin_of(url) or url for url in config.exclude}
+    if config.origin:
+        skipped.add(origin_of(config.origin) or config.origin)
+    skipped |= page.hinted
+
+    preconnect: List[str] = []
+    dns_prefetch: List[str] = []
+    for origin in [origin_of(url) for url in config.preconnect] + page.fetched:
+        if origin is not None and origin not in skipped and origin not in preconnect:
+            preconnect.append(origin)
+    preconnect, overflow = preconnect[: config.max_preconnect], preconnect[config.max_preconnect :]
+    for origin in overflow + [origin_of(url) for url in config.dns_prefetch] + page.scripted:
+        if origin is not None and origin not in skipped and origin not in preconnect and origin not in dns_prefetch:
+            dns_prefetch.append(origin)
+
+    links = [f'<link rel="preconnect" href="{escape(origin)}">' for origin in preconnect]
+    links += [f'<link rel="dns-prefetch" href="{escape(origin)}">' for origin in dns_prefetch]
+
+    rules = [rule for style in page.styles for rule in _rules(parse_css(style))]
+    preload: List[Tuple[str, str]] = []
+    for url, media in background_images(rules, first_viewport_names(page, rules)):
+        if url.startswith("data:") or url in page.images or url in page.preloaded or url in (item[0] for item in preload):
+            continue
+        preload.append((url, media))
+    for url, media in preload[: config.preload_images]:
+        condition = f' media="{escape(media)}"' if media else ""
+        links.append(f'<link rel="preload" as="image" href="{escape(url)}"{condition} fetchpriority="high">')
+    return links
+
+
+def add_resource_hints(html: str, config: HintConfig) -> str:
+    """Insert the hints of ``html`` right after ``<meta charset>`` (or the ``<head>`` tag)."""
+    if not config.enabled:
+        return html
+    links = collect_hints(html, config)
+    if not links:
+        return html
+    head_end = html.lower().find("</head")
+    match = _CHARSET.search(html, 0, head_end if head_end >= 0 else len(html)) or _HEAD.search(html)
+    if match is None:
+        return html
+    indent = match.group(1) if match.re is _CHARSET else "  "
+    block = "".join(f"{indent}{link}\n" for link in links)
+    text = match.group(0) if match.group(0).endswith("\n") else match.group(0) + "\n"
+    return html[: match.start()] + text + block + html[match.end() :]
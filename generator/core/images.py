@@ -0,0 +1,157 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import json
+
+try:
+    from PIL import Image, features
+except ImportError:  # pragma: no cover
+    Image = None  # type: ignore[assignment]
+    features = None  # type: ignore[assignment]
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+IMAGE_WIDTHS = (160, 320, 480, 768, 1200)
+VARIANTS_DIRECTORY = Path("sources") / "_variants"
+IMAGE_MANIFEST = "images.json"
+# Favicons already ship in every size they are used at.
+IMAGE_EXCLUDE = ("sources/logo/",)
+
+
+class ImageManifest:
+    """Responsive variants per source image, keyed by its path relative to ``sites/``."""
+
+    def __init__(self, sites_directory: Path) -> None:
+        self.sites_directory = sites_directory
+        self.path = sites_directory / VARIANTS_DIRECTORY / IMAGE_MANIFEST
+        self.images: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            self.images = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self.images, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    def get(self, src: str) -> Optional[Dict[str, Any]]:
+        return self.images.get(src)
+
+    def picture(self, sizes: str = "100vw", **attributes: Any) -> str:
+        """The ``<img>`` these attributes describe, with responsive variants of its ``src``.
+
+        The ``<img>`` gets a srcset of variants in the source format plus width/height; WebP variants
+        go into a ``<picture>`` ``<source type="image/webp">`` so browsers pick them by format support.
+        Unknown sources stay a plain ``<img>``.
+        """
+        entry = self.get(str(attributes.get("src", "")))
+        if entry is None:
+            return no_picture(**attributes)
+        img: Dict[str, Any] = {}
+        for name, value in attributes.items():
+            img[name] = value
+            if name == "src":
+                if entry["variants"].get("source"):
+                    img.update(srcset=_srcset(entry["variants"]["source"]), sizes=sizes)
+                img.update(width=entry["width"], height=entry["height"])
+        webp = entry["variants"].get("webp")
+        if not webp:
+            return f"<img{_attributes(img)}>"
+        return f'<picture><source type="image/webp" srcset="{_srcset(webp)}" sizes="{sizes}"><img{_attributes(img)}></picture>'
+
+
+def _srcset(variants: List[Any]) -> str:
+    return ", ".join(f"{file} {width}w" for file, width in variants)
+
+
+def _attributes(attributes: Dict[str, Any]) -> str:
+    return "".join(f' {name}="{value}"' for name, value in attributes.items())
+
+
+def no_picture(sizes: str = "100vw", **attributes: Any) -> str:
+    """``<img>`` with the given attributes, in the order given; used when images are not optimized."""
+    return f"<img{_attributes(attributes)}>"
+
+
+def _variant_name(relative: Path, digest: str, width: int, extension: str) -> str:
+    stem = relative.relative_to("sources").with_suffix("").as_posix().replace("/", "_")
+    return f"{stem}.{digest[:12]}.{width}w{extension}"
+
+
+def _save(image: Any, target: Path, extension: str) -> None:
+    if extension == ".webp":
+        image.save(target, "WEBP", quality=80, method=6)
+    elif extension == ".png":
+        image.save(target, "PNG", optimize=True)
+    else:
+        image.convert("RGB").save(target, "JPEG", quality=82, optimize=True, progressive=True)
+
+
+def _render_variants(source: Path, relative: Path, digest: str, output_directory: Path, widths: Sequence[int]) -> Dict[str, Any]:
+    assert Image is not None
+    with Image.open(source) as original:
+        original.load()
+        width, height = original.size
+        extension = ".jpg" if source.suffix.lower() == ".jpeg" else source.suffix.lower()
+        formats: List[Tuple[str, str]] = [("source", extension)]
+        if features.check("webp"):
+            formats.append(("webp", ".webp"))
+
+        variants: Dict[str, List[Tuple[str, int]]] = {}
+        targets = [w for w in widths if w < width] + [width]
+        for kind, variant_extension in formats:
+            for target_width in targets:
+                if kind == "source" and target_width == width:
+                    # The original file itself is the full-size fallback.
+                    file = relative.as_posix()
+                else:
+                    name = _variant_name(relative, digest, target_width, variant_extension)
+                    resized: Any = original
+                    if target_width != width:
+                        size = (target_width, round(height * target_width / width))
+                        resized = original.resize(size, Image.Resampling.LANCZOS)
+                    _save(resized, output_directory / name, variant_extension)
+                    file = (VARIANTS_DIRECTORY / name).as_posix()
+                variants.setdefault(kind, []).append((file, target_width))
+    return {"hash": digest, "width": width, "height": height, "variants": variants}
+
+
+def optimize_images(sites_directory: Path, widths: Sequence[int] = IMAGE_WIDTHS) -> ImageManifest:
+    """Generate resized/recompressed variants for ``sites/sources`` images.
+
+    Images whose content hash matches the manifest keep their variants; stale variants are removed.
+    """
+    manifest = ImageManifest(sites_directory)
+    if Image is None:
+        print("Pillow is not installed, skipping image optimization.")
+        return manifest
+
+    output_directory = sites_directory / VARIANTS_DIRECTORY
+    output_directory.mkdir(parents=True, exist_ok=True)
+    sources = sorted(
+        path
+        for path in (sites_directory / "sources").rglob("*")
+        if path.suffix.lower() in IMAGE_EXTENSIONS
+        and output_directory not in path.parents
+        and not path.relative_to(sites_directory).as_posix().startswith(IMAGE_EXCLUDE)
+    )
+
+    images: Dict[str, Dict[str, Any]] = {}
+    for source in sources:
+        relative = source.relative_to(sites_directory)
+        key = relative.as_posix()
+        digest = hashlib.sha256(source.read_bytes()).hexdigest()
+        entry = manifest.get(key)
+        files = [sites_directory / file for kind in (entry or {}).get("variants", {}).values() for file, _ in kind]
+        if entry is not None and entry["hash"] == digest and all(file.exists() for file in files):
+            images[key] = entry
+            continue
+        print(f"Optimize image {key} ...")
+        images[key] = _render_variants(source, relative, digest, output_directory, widths)
+
+    used = {Path(file).name for entry in images.values() for kind in entry["variants"].values() for file, _ in kind}
+    for variant in output_directory.iterdir():
+        if variant.name != IMAGE_MANIFEST and variant.name not in used:
+            variant.unlink()
+
+    manifest.images = images
+    manifest.save()
+    return manifest
@@ -0,0 +1,87 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, TYPE_CHECKING
+import hashlib
+import json
+
+if TYPE_CHECKING:  # pragma: no cover
+    from generator.core.cli_core3 import Block
+
+MANIFEST_VERSION = 1
+BLOCK_FILES = ("base.j2", "base.css", "base.js", "content.schema")
+
+Inputs = Dict[str, Optional[str]]
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BuildManifest:
+    """Content hashes of every input that fed each generated page.
+
+    A page is rebuilt only when one of its recorded inputs (block JSON, block
+    files, generator sources) or the page itself differs from the manifest.
+    With ``force`` every page is rebuilt; entries of pages not rendered are kept.
+    """
+
+    def __init__(self, path: Path, force: bool = False) -> None:
+        self.path = path
+        self.force = force
+        self._pages: Dict[str, Dict[str, Any]] = {}
+        self._file_hashes: Dict[str, Optional[str]] = {}
+        self.load()
+
+    def load(self) -> None:
+        self._pages = {}
+        if not self.path.exists():
+            return
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if isinstance(data, dict) and data.get("version") == MANIFEST_VERSION:
+            self._pages = data.get("pages", {})
+
+    def save(self) -> None:
+        data = {"version": MANIFEST_VERSION, "pages": self._pages}
+        self.path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    def invalidate_files(self) -> None:
+        """Forget memoized file hashes, e.g. after a watcher saw files change."""
+        self._file_hashes.clear()
+
+    def file_hash(self, path: Path) -> Optional[str]:
+        key = str(path)
+        if key not in self._file_hashes:
+            self._file_hashes[key] = hash_bytes(path.read_bytes()) if path.is_file() else None
+        return self._file_hashes[key]
+
+    def generator_hash(self) -> str:
+        sources = sorted(Path(__file__).parent.glob("*.py"))
+        return hash_bytes(b"".join(source.read_bytes() for source in sources))
+
+    def collect_inputs(self, blocks: Iterable[Block], block_dir: Path) -> Inputs:
+        inputs: Inputs = {"generator": self.generator_hash()}
+        for block in blocks:
+            inputs[f"json/{block.block_name}"] = block.fingerprint()
+            for file_name in BLOCK_FILES:
+                inputs[f"blocks/{block.block_name}/{file_name}"] = self.file_hash(block_dir / block.block_name / file_name)
+        return inputs
+
+    def is_fresh(self, site_file: Path, inputs: Inputs) -> bool:
+        page = self._pages.get(site_file.name)
+        if self.force or page is None or page.get("inputs") != inputs:
+            return False
+        if not site_file.is_file():
+            return False
+        return bool(page.get("output") == hash_bytes(site_file.read_bytes()))
+
+    def entry(self, page_name: str) -> Optional[Dict[str, Any]]:
+        return self._pages.get(page_name)
+
+    def set_entry(self, page_name: str, entry: Dict[str, Any]) -> None:
+        self._pages[page_name] = entry
+
+    def record(self, site_file: Path, inputs: Inputs) -> None:
+        self._pages[site_file.name] = {
+            "inputs": inputs,
+            "output": hash_bytes(site_file.read_bytes()),
+        }
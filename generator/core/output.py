@@ -0,0 +1,90 @@
+from __future__ import annotations
+from pathlib import Path
+from types import ModuleType
+from typing import Callable, Dict, List, Optional
+import gzip
+import importlib
+import os
+import re
+
+# brotli ships no type stubs, so it is imported dynamically.
+brotli: Optional[ModuleType]
+try:
+    brotli = importlib.import_module("brotli")
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Elements whose text is rendered as written and must not be touched.
+_RAW_ELEMENTS = ("pre", "textarea", "script", "style")
+_HTML_TOKEN = re.compile(
+    r"(<!--\[if.*?-->)|(<!--.*?-->)|(<(" + "|".join(_RAW_ELEMENTS) + r")\b[^>]*>.*?</\4\s*>)|(<[^>]*>)",
+    re.S | re.I,
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _collapse(text: str) -> str:
+    return _WHITESPACE.sub(lambda match: "\n" if "\n" in match.group() else " ", text)
+
+
+def minify_html(html: str) -> str:
+    """Collapse whitespace runs between and around tags and drop comments.
+
+    A run containing a line break becomes one newline, any other run one space, so rendering is
+    unchanged. Tags, conditional comments and the content of pre/textarea/script/style are kept verbatim.
+    """
+    parts: List[str] = []
+    position = 0
+    for match in _HTML_TOKEN.finditer(html):
+        parts.append(_collapse(html[position : match.start()]))
+        conditional, _comment, raw, _name, tag = match.groups()
+        parts.append(conditional or raw or tag or "")
+        position = match.end()
+    parts.append(_collapse(html[position:]))
+    return "".join(parts).strip() + "\n"
+
+
+def _gzip(data: bytes) -> bytes:
+    # mtime=0 keeps the sidecar byte-identical between builds.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    """Sidecar suffix -> compressor; ``.br`` only when the brotli package is installed."""
+    result: Dict[str, Callable[[bytes], bytes]] = {".gz": _gzip}
+    if brotli is not None:
+        compress = brotli.compress
+        result[".br"] = lambda data: bytes(compress(data, quality=11))
+    return result
+
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """Atomically replace ``path`` with ``data`` unless it already holds exactly these bytes."""
+    if path.is_file() and path.read_bytes() == data:
+        return False
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        temporary.write_bytes(data)
+        os.replace(temporary, path)
+    finally:
+        if temporary.exists():
+            temporary.unlink()
+    return True
+
+
+def write_page(path: Path, html: str, minify: bool = False, compress: bool = False) -> bool:
+    """Write a generated page and its precompressed sidecars; returns True when the page changed.
+
+    Without ``compress`` stale ``.gz``/``.br`` sidecars are removed so they never shadow a newer page.
+    """
+    data = (minify_html(html) if minify else html).encode("utf-8")
+    changed = write_if_changed(path, data)
+    available = compressors() if compress else {}
+    for suffix in (".gz", ".br"):
+        sidecar = path.with_name(path.name + suffix)
+        if suffix in available:
+            if changed or not sidecar.exists():
+                write_if_changed(sidecar, available[suffix](data))
+        elif sidecar.exists():
+            sidecar.unlink()
+    return changed
@@ -0,0 +1,143 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+import contextlib
+import io
+import traceback
+
+from generator.core.budget import BudgetReport
+from generator.core.bundle import use_bundle
+from generator.core.cli_core3 import BackboneSnapshot, BuildOptions, main, precompile_templates
+from generator.core.manifest import BuildManifest
+from generator.core.profiler import PROFILER
+
+
+class RenderResult(NamedTuple):
+    site_name: str
+    lang: str
+    rendered: bool
+    log: str
+    error: Optional[str]
+    manifest_entry: Optional[Dict[str, Any]]
+    budget_entry: Optional[Dict[str, Any]]
+    trace_events: List[Dict[str, Any]]
+
+
+# Per-process state set up once by the pool initializer.
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def _init_worker(
+    json_directory: Path,
+    block_directory: Path,
+    sites_directory: Path,
+    backbone: BackboneSnapshot,
+    cache_directory: Optional[Path],
+    manifest: Optional[BuildManifest],
+    options: Optional[BuildOptions],
+    profile: bool,
+    block_jobs: int = 1,
+    bundle: Optional[Path] = None,
+    budget: Optional[BudgetReport] = None,
+) -> None:
+    if profile:
+        PROFILER.enable()
+    if bundle is not None:
+        use_bundle(bundle, json_directory, block_directory, cache_directory)
+    precompile_templates(block_directory, cache_directory)
+    _WORKER_STATE.update(
+        json_directory=json_directory,
+        block_directory=block_directory,
+        sites_directory=sites_directory,
+        backbone=backbone,
+        cache_directory=cache_directory,
+        manifest=manifest,
+        options=options,
+        block_jobs=block_jobs,
+        budget=budget,
+    )
+
+
+def _render(site_name: str, lang: str) -> RenderResult:
+    state = _WORKER_STATE
+    manifest: Optional[BuildManifest] = state["manifest"]
+    budget: Optional[BudgetReport] = state["budget"]
+    log = io.StringIO()
+    rendered = False
+    error = None
+    try:
+        with contextlib.redirect_stdout(log):
+            rendered = main(
+                state["json_directory"],
+                state["block_directory"],
+                state["sites_directory"],
+                site_name,
+                lang,
+                backbone=state["backbone"],
+                cache_directory=state["cache_directory"],
+                manifest=manifest,
+                options=state["options"],
+                block_jobs=state["block_jobs"],
+                budget=budget,
+            )
+    except Exception:
+        error = traceback.format_exc()
+
+    page_name = f"{site_name}_{lang}.html"
+    entry = manifest.entry(page_name) if manifest is not None and rendered else None
+    weights = budget.entry(page_name) if budget is not None and rendered else None
+    return RenderResult(site_name, lang, rendered, log.getvalue(), error, entry, weights, PROFILER.drain())
+
+
+def render_sites(
+    sites: List[Dict[str, str]],
+    json_directory: Path,
+    block_directory: Path,
+    sites_directory: Path,
+    backbone: BackboneSnapshot,
+    jobs: int = 1,
+    cache_directory: Optional[Path] = None,
+    manifest: Optional[BuildManifest] = None,
+    options: Optional[BuildOptions] = None,
+    block_jobs: int = 1,
+    bundle: Optional[Path] = None,
+    budget: Optional[BudgetReport] = None,
+) -> List[RenderResult]:
+    """Render every site/lang pair, in worker processes when ``jobs`` > 1.
+
+    Errors are collected per site instead of stopping the run. Results keep the order of ``sites``.
+    """
+    initargs = (
+        json_directory,
+        block_directory,
+        sites_directory,
+        backbone,
+        cache_directory,
+        manifest,
+        options,
+        PROFILER.enabled,
+        block_jobs,
+        bundle,
+        budget,
+    )
+    jobs = max(1, min(jobs, len(sites)))
+    if jobs == 1:
+        _init_worker(*initargs)
+        results = [_render(item["site_name"], item["lang"]) for item in sites]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as pool:
+            futures = [pool.submit(_render, item["site_name"], item["lang"]) for item in sites]
+            results = [future.result() for future in futures]
+
+    for result in results:
+        PROFILER.extend(result.trace_events)
+    if manifest is not None:
+        for result in results:
+            if result.manifest_entry is not None:
+                manifest.set_entry(f"{result.site_name}_{result.lang}.html", result.manifest_entry)
+    if budget is not None:
+        for result in results:
+            if result.budget_entry is not None:
+                budget.set_entry(f"{result.site_name}_{result.lang}.html", result.budget_entry)
+    return results
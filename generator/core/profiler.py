@@ -0,0 +1,96 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+BLOCK_PHASES = ("schema validation", "template compile", "asset load", "render")
+
+
+class Profiler:
+    """Records wall time and net allocations of build phases as Chrome trace events.
+
+    Disabled by default, so ``phase()`` costs one attribute check on the normal build path.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.events: List[Dict[str, Any]] = []
+
+    def enable(self) -> None:
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self) -> None:
+        self.enabled = False
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def phase(self, name: str, **args: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        memory_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter_ns() - start
+            allocated = tracemalloc.get_traced_memory()[0] - memory_before
+            self.events.append(
+                {
+                    "name": name,
+                    "cat": "sitegen",
+                    "ph": "X",
+                    "ts": start / 1000,
+                    "dur": duration / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": dict(args, alloc_bytes=allocated),
+                }
+            )
+
+    def drain(self) -> List[Dict[str, Any]]:
+        events, self.events = self.events, []
+        return events
+
+    def extend(self, events: List[Dict[str, Any]]) -> None:
+        self.events.extend(events)
+
+    def write_trace(self, path: Path) -> None:
+        trace = {"traceEvents": sorted(self.events, key=lambda event: (event["pid"], event["ts"])), "displayTimeUnit": "ms"}
+        path.write_text(json.dumps(trace, indent=1) + "\n", encoding="utf-8")
+
+    def summary(self, top: int = 10) -> str:
+        phases: Dict[str, List[float]] = {}
+        blocks: Dict[str, Dict[str, float]] = {}
+        for event in self.events:
+            totals = phases.setdefault(event["name"], [0.0, 0.0])
+            totals[0] += event["dur"] / 1000
+            totals[1] += event["args"]["alloc_bytes"] / 1024
+            block_name = event["args"].get("block")
+            if block_name:
+                block = blocks.setdefault(block_name, {"total": 0.0, "alloc": 0.0})
+                block["total"] += event["dur"] / 1000
+                block["alloc"] += event["args"]["alloc_bytes"] / 1024
+                block[event["name"]] = block.get(event["name"], 0.0) + event["dur"] / 1000
+
+        lines = [f"{'phase'.ljust(24)} {'ms':>10} {'alloc KB':>10}"]
+        for name, (duration, allocated) in sorted(phases.items(), key=lambda item: -item[1][0]):
+            lines.append(f"{name.ljust(24)} {duration:10.2f} {allocated:10.1f}")
+
+        header = "".join(f" {name[:10]:>10}" for name in BLOCK_PHASES)
+        lines += ["", f"{'slowest blocks'.ljust(24)} {'ms':>10}{header} {'alloc KB':>10}"]
+        for name, block in sorted(blocks.items(), key=lambda item: -item[1]["total"])[:top]:
+            columns = "".join(f" {block.get(phase, 0.0):10.2f}" for phase in BLOCK_PHASES)
+            lines.append(f"{name.ljust(24)} {block['total']:10.2f}{columns} {block['alloc']:10.1f}")
+        return "\n".join(lines)
+
+
+PROFILER = Profiler()
@@ -0,0 +1,188 @@
+from __future__ import annotations
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+import glob
+import threading
+import time
+import traceback
+
+from generator.core.cli_core3 import ROOT_NAME, BackboneSnapshot, BuildOptions, LazyBackbone, main
+from generator.core.manifest import BuildManifest
+
+RELOAD_PATH = "/__livereload"
+RELOAD_SCRIPT = f'<script>new EventSource("{RELOAD_PATH}").onmessage = function () {{ location.reload(); }};</script>'
+
+
+class ReloadNotifier:
+    """Version counter that wakes up every live-reload connection when bumped."""
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self.version = 0
+
+    def notify(self) -> None:
+        with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+
+class Watcher:
+    """Polls file mtimes and reports which watched files changed."""
+
+    def __init__(self, patterns: Iterable[Path]) -> None:
+        self.patterns = list(patterns)
+        self._mtimes = self._scan()
+
+    def _scan(self) -> Dict[Path, int]:
+        mtimes: Dict[Path, int] = {}
+        for pattern in self.patterns:
+            for name in glob.glob(str(pattern)):
+                path = Path(name)
+                if path.is_file():
+                    mtimes[path] = path.stat().st_mtime_ns
+        return mtimes
+
+    def changes(self) -> Set[Path]:
+        mtimes = self._scan()
+        changed = {path for path in mtimes.keys() | self._mtimes.keys() if mtimes.get(path) != self._mtimes.get(path)}
+        self._mtimes = mtimes
+        return changed
+
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    notifier: ReloadNotifier
+
+    def __init__(self, *args: Any, notifier: ReloadNotifier, **kwargs: Any) -> None:
+        self.notifier = notifier
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self) -> None:
+        if self.path == RELOAD_PATH:
+            self._stream_reloads()
+            return
+        if self.path.split("?")[0].endswith(".html"):
+            self._send_html()
+            return
+        super().do_GET()
+
+    def _send_html(self) -> None:
+        file_path = Path(self.translate_path(self.path.split("?")[0]))
+        if not file_path.is_file():
+            self.send_error(404, "File not found")
+            return
+        text = file_path.read_text(encoding="utf-8")
+        if "</body>" in text:
+            text = text.replace("</body>", RELOAD_SCRIPT + "\n</body>", 1)
+        else:
+            text += RELOAD_SCRIPT
+        data = text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream_reloads(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        version = self.notifier.version
+        try:
+            while True:
+                new_version = self.notifier.wait(version, timeout=15)
+                if new_version != version:
+                    version = new_version
+                    self.wfile.write(b"data: reload\n\n")
+                else:
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class DevServer:
+    """Keeps backbone, templates and schemas warm and rebuilds one page on change."""
+
+    def __init__(
+        self,
+        json_directory: Path,
+        block_directory: Path,
+        sites_directory: Path,
+        site_name: str,
+        lang: str,
+        manifest: BuildManifest,
+        sites_file: Path = Path("generator/sites.txt"),
+        cache_directory: Optional[Path] = None,
+        options: Optional[BuildOptions] = None,
+    ) -> None:
+        self.json_directory = json_directory
+        self.block_directory = block_directory
+        self.sites_directory = sites_directory
+        self.site_name = site_name
+        self.lang = lang
+        self.manifest = manifest
+        self.cache_directory = cache_directory
+        self.options = options
+        self.notifier = ReloadNotifier()
+        self.watcher = Watcher([json_directory / "*.json", block_directory / "*" / "*", sites_file])
+        self._loader = LazyBackbone(json_directory, block_directory)
+        self._backbone: Optional[BackboneSnapshot] = None
+
+    def rebuild(self, changed: Iterable[Path] = ()) -> bool:
+        changed = list(changed)
+        if self._backbone is None or any(path.suffix == ".json" for path in changed):
+            self._backbone = self._loader.snapshot_for(self.site_name, self.lang, ROOT_NAME)
+        self.manifest.invalidate_files()
+        try:
+            rendered = main(
+                self.json_directory,
+                self.block_directory,
+                self.sites_directory,
+                self.site_name,
+                self.lang,
+                backbone=self._backbone,
+                cache_directory=self.cache_directory,
+                manifest=self.manifest,
+                options=self.options,
+            )
+        except Exception:
+            traceback.print_exc()
+            return False
+        if rendered:
+            self.manifest.save()
+            self.notifier.notify()
+        return rendered
+
+    def watch(self, interval: float = 0.5) -> None:
+        while True:
+            time.sleep(interval)
+            changed: List[Path] = sorted(self.watcher.changes())
+            if changed:
+                print("Changed: " + ", ".join(str(path) for path in changed))
+                self.rebuild(changed)
+
+    def serve_forever(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+        self.rebuild()
+        handler = partial(LiveReloadHandler, directory=str(self.sites_directory), notifier=self.notifier)
+        httpd = ThreadingHTTPServer((host, port), handler)
+        httpd.daemon_threads = True
+        threading.Thread(target=self.watch, daemon=True).start()
+        print(f"Serving http://{host}:{port}/{self.site_name}_{self.lang}.html (Ctrl+C to stop)")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            httpd.server_close()
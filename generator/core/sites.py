@@ -0,0 +1,47 @@
+"""Site list access that stays cheap enough for shell completion (stdlib only)."""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List, Optional
+import json
+import os
+
+SITES_FILE = "generator/sites.txt"
+
+
+def get_sites(site_path: str = SITES_FILE) -> List[Dict[str, str]]:
+    sites: List[Dict[str, str]] = []
+    path = Path(site_path)
+    for item in path.read_text(encoding="utf-8").splitlines():
+        site_name, lang = item.split(":")
+        sites.append({"site_name": site_name, "lang": lang})
+    return sites
+
+
+def sites_index(site_path: str = SITES_FILE, index_file: Optional[Path] = None) -> Dict[str, List[str]]:
+    """site_name -> langs, in ``sites.txt`` order.
+
+    With ``index_file`` the parsed index is cached there and reused while the size and mtime of
+    ``site_path`` are unchanged.
+    """
+    stat = os.stat(site_path)
+    signature = [stat.st_mtime_ns, stat.st_size]
+    if index_file is not None:
+        try:
+            cached = json.loads(index_file.read_text(encoding="utf-8"))
+            if cached.get("signature") == signature:
+                index: Dict[str, List[str]] = cached["sites"]
+                return index
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    index = {}
+    for item in get_sites(site_path):
+        index.setdefault(item["site_name"], []).append(item["lang"])
+    if index_file is not None:
+        try:
+            index_file.parent.mkdir(parents=True, exist_ok=True)
+            index_file.write_text(json.dumps({"signature": signature, "sites": index}), encoding="utf-8")
+        except OSError:
+            pass  # completion must never fail because the cache is not writable
+    return index
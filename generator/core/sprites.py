@@ -0,0 +1,174 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+import hashlib
+import json
+import re
+
+SPRITE_SOURCES = ("sources/icons", "sources/flags", "sources/logo")
+SPRITES_DIRECTORY = Path("sources") / "_sprites"
+SPRITE_MANIFEST = "sprites.json"
+# Optimized SVGs up to this size are written into the page instead of the sprite.
+INLINE_BYTES = 512
+
+_JUNK = re.compile(
+    r"<\?xml.*?\?>|<!DOCTYPE[^>]*>|<!--.*?-->|<(title|desc|metadata|sodipodi:\w+|inkscape:\w+)\b[^>]*?(?:/>|>.*?</\1\s*>)",
+    re.S | re.I,
+)
+_EDITOR_ATTRIBUTE = re.compile(r"""\s+(?:xmlns:(?:sodipodi|inkscape|dc|cc|rdf)|sodipodi:[\w-]+|inkscape:[\w-]+|xml:space)\s*=\s*("[^"]*"|'[^']*')""")
+_BETWEEN_TAGS = re.compile(r">\s+<")
+_ROOT = re.compile(r"<svg\b([^>]*)>(.*)</svg\s*>", re.S | re.I)
+_ATTRIBUTE = re.compile(r"""([\w:.-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+_ID = re.compile(r"""\bid\s*=\s*["']([^"']+)["']""")
+# Root attributes that describe the document rather than the drawing.
+_DOCUMENT_ATTRIBUTES = frozenset({"xmlns", "xmlns:xlink", "version", "width", "height", "x", "y", "id", "baseprofile"})
+
+
+class SvgSource(NamedTuple):
+    attributes: Dict[str, str]  # root <svg> attributes, in source order
+    body: str
+
+    @property
+    def view_box(self) -> str:
+        view_box = self.attributes.get("viewBox")
+        if view_box:
+            return view_box
+        return f"0 0 {_number(self.attributes.get('width', '0'))} {_number(self.attributes.get('height', '0'))}"
+
+
+def _number(value: str) -> str:
+    return value[:-2] if value.endswith("px") else value
+
+
+def optimize_svg(text: str) -> str:
+    """Drop the XML prolog, comments, title/desc/metadata, editor namespaces and whitespace between tags."""
+    text = _JUNK.sub("", text)
+    text = _EDITOR_ATTRIBUTE.sub("", text)
+    text = re.sub(r"""\s+version\s*=\s*("[^"]*"|'[^']*')""", "", text, count=1)
+    return _BETWEEN_TAGS.sub("><", text).strip()
+
+
+def parse_svg(text: str) -> SvgSource:
+    match = _ROOT.search(text)
+    if match is None:
+        raise ValueError("Not an SVG document")
+    attributes = {name: double if double is not None else single for name, double, single in _ATTRIBUTE.findall(match.group(1))}
+    return SvgSource(attributes, match.group(2).strip())
+
+
+def _scope_ids(body: str, prefix: str) -> str:
+    """Prefix ids (and references to them) so symbols of one sprite cannot clash."""
+    for name in set(_ID.findall(body)):
+        scoped = f"{prefix}-{name}"
+        body = re.sub(rf"""(\bid\s*=\s*["']){re.escape(name)}(["'])""", rf"\g<1>{scoped}\g<2>", body)
+        body = re.sub(rf"""((?:xlink:)?href\s*=\s*["'])#{re.escape(name)}(["'])""", rf"\g<1>#{scoped}\g<2>", body)
+        body = body.replace(f"url(#{name})", f"url(#{scoped})")
+    return body
+
+
+def _drawing_attributes(source: SvgSource) -> str:
+    return "".join(
+        f' {name}="{value}"' for name, value in source.attributes.items() if name.lower() not in _DOCUMENT_ATTRIBUTES and name != "viewBox"
+    )
+
+
+def symbol_id(relative: str) -> str:
+    """``sources/icons/phone.svg`` -> ``icons-phone``."""
+    stem = Path(relative).relative_to("sources").with_suffix("").as_posix()
+    return re.sub(r"[^\w-]", "-", stem.replace("/", "-"))
+
+
+def _attributes(attributes: Dict[str, Any]) -> str:
+    return "".join(f' {name}="{value}"' for name, value in attributes.items())
+
+
+def no_sprite_icon(**attributes: Any) -> str:
+    """``<img>`` with the given attributes, in the order given; used when sprites are off."""
+    return f"<img{_attributes(attributes)}>"
+
+
+class SpriteManifest:
+    """Symbols of the current sprite, keyed by source path relative to ``sites/``."""
+
+    def __init__(self, sites_directory: Path) -> None:
+        self.sites_directory = sites_directory
+        self.path = sites_directory / SPRITES_DIRECTORY / SPRITE_MANIFEST
+        self.sprite = ""
+        self.symbols: Dict[str, Dict[str, Any]] = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.sprite = data["sprite"]
+            self.symbols = data["symbols"]
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"sprite": self.sprite, "symbols": self.symbols}
+        self.path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    def get(self, src: str) -> Optional[Dict[str, Any]]:
+        return self.symbols.get(src)
+
+    def icon(self, **attributes: Any) -> str:
+        """An ``<svg>`` for the ``<img>`` these attributes describe: inline, or a ``<use>`` of the sprite.
+
+        ``src`` is replaced by the symbol, ``alt`` by ``role="img"``/``aria-label`` (or ``aria-hidden``
+        when empty). Without ``width``/``height`` the size comes from CSS and the viewBox, not from the
+        (often huge) size written in the source file. Sources that are not in the sprite stay an ``<img>``.
+        """
+        entry = self.get(str(attributes.get("src", "")))
+        if entry is None:
+            return no_sprite_icon(**attributes)
+        svg: Dict[str, Any] = {}
+        for name, value in attributes.items():
+            if name == "alt":
+                svg.update({"role": "img", "aria-label": value} if value else {"aria-hidden": "true"})
+            elif name not in ("src", "loading", "decoding"):
+                svg[name] = value
+        svg["viewBox"] = entry["view_box"]
+        if entry["inline"] is not None:
+            return f'<svg xmlns="http://www.w3.org/2000/svg"{_attributes(svg)}{entry["attributes"]}>{entry["inline"]}</svg>'
+        return f'<svg{_attributes(svg)}><use href="{SPRITES_DIRECTORY.as_posix()}/{self.sprite}#{entry["id"]}"></use></svg>'
+
+
+def build_sprite(sites_directory: Path, inline_bytes: int = INLINE_BYTES) -> SpriteManifest:
+    """Optimize the SVGs of ``SPRITE_SOURCES`` and write them as one content-hashed sprite.
+
+    SVGs that end up no larger than ``inline_bytes`` are kept in the manifest for inlining instead.
+    Older sprites are removed.
+    """
+    manifest = SpriteManifest(sites_directory)
+    output_directory = sites_directory / SPRITES_DIRECTORY
+    symbols: Dict[str, Dict[str, Any]] = {}
+    parts: List[str] = []
+    xlink = False
+    for directory in SPRITE_SOURCES:
+        for source in sorted((sites_directory / directory).glob("*.svg")):
+            relative = source.relative_to(sites_directory).as_posix()
+            original = source.read_text(encoding="utf-8")
+            svg = parse_svg(optimize_svg(original))
+            identifier = symbol_id(relative)
+            body = _scope_ids(svg.body, identifier)
+            attributes = _drawing_attributes(svg)
+            inline = body if len(body) + len(attributes) <= inline_bytes else None
+            symbols[relative] = {"id": identifier, "view_box": svg.view_box, "attributes": attributes, "inline": inline}
+            if inline is None:
+                parts.append(f'<symbol id="{identifier}" viewBox="{svg.view_box}"{attributes}>{body}</symbol>')
+                xlink = xlink or "xlink:" in body
+            suffix = " (inline)" if inline is not None else ""
+            print(f"Sprite {relative}: {len(original.encode('utf-8'))} -> {len(body.encode('utf-8'))} bytes{suffix}")
+
+    namespaces = ' xmlns="http://www.w3.org/2000/svg"' + (' xmlns:xlink="http://www.w3.org/1999/xlink"' if xlink else "")
+    sprite = f"<svg{namespaces}>{''.join(parts)}</svg>\n"
+    digest = hashlib.sha256(sprite.encode("utf-8")).hexdigest()[:12]
+    name = f"sprite.{digest}.svg"
+    output_directory.mkdir(parents=True, exist_ok=True)
+    if not (output_directory / name).exists():
+        (output_directory / name).write_text(sprite, encoding="utf-8")
+    for old in output_directory.glob("sprite.*.svg"):
+        if old.name != name:
+            old.unlink()
+
+    manifest.sprite = name
+    manifest.symbols = symbols
+    manifest.save()
+    return manifest
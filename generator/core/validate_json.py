@@ -1,49 +1,156 @@
+import bisect
+import hashlib
 import json
-from typing import Any
-from typing import List, Union
+import re
+from json.scanner import NUMBER_RE
+from typing import Any, Mapping, Sequence
+from typing import Dict, List, Optional, Set, Tuple, Union
 from pathlib import Path
-from jsonschema import Draft202012Validator
-
-
-class DFS:
-    def __init__(self, target_path: List[str]) -> None:
-        self.found: bool = False
-        self.target_path = target_path
-        self.value: Any
-        self.line_number = 0
-
-    def _walk(self, data: Any, current_path: List[Union[str, int]]) -> int:
-        if self.found:
-            return self.line_number
-
-        if current_path == self.target_path:
-            self.found = True
-            self.value = data
-
-        if isinstance(data, dict):
-            self.line_number += 1  # {
-            for key, value in data.items():
-                self._walk(value, current_path + [key])
-                if self.found:
-                    return self.line_number
-        if isinstance(data, list):
-            self.line_number += 1  # [
-            for i, value in enumerate(data):
-                self._walk(value, current_path + [i])
-                if self.found:
-                    return self.line_number
-        self.line_number += 1  # ] or }
-        return self.line_number
-
-    def path_to_number(self, data: Any) -> int:
-        line = self._walk(data, [])
-        if self.found is False:
-            raise KeyError(f"Path {self.target_path!r} not found")
-        return line
+from jsonschema import Draft202012Validator, validators
+
+
+def _is_object(checker: Any, instance: Any) -> bool:
+    return isinstance(instance, Mapping)
+
+
+# jsonschema 4.2 has no Validator protocol to annotate validator classes built by ``extend``.
+Validator = Any
+
+# Draft 2020-12 that also accepts read-only mappings (Content.get_content_dict) as JSON objects.
+ContentValidator = validators.extend(
+    Draft202012Validator,
+    type_checker=Draft202012Validator.TYPE_CHECKER.redefine("object", _is_object),
+)
+
+
+def _plain(value: Any) -> Any:
+    return dict(value)
+
+
+JsonPath = Tuple[Union[str, int], ...]
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.S)
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+class JsonSource:
+    """JSON text parsed once with the line number of every value (and object key) recorded."""
+
+    def __init__(self, text: str, name: str = "<json>") -> None:
+        self.text = text
+        self.name = name
+        self.lines = text.splitlines()
+        self._newlines = [match.start() for match in re.finditer("\n", text)]
+        self.positions: Dict[JsonPath, int] = {}
+        value, end = self._value(0, ())
+        if self._skip(end) != len(text):
+            raise json.JSONDecodeError("Extra data", text, self._skip(end))
+        self.data = value
+
+    @classmethod
+    def from_file(cls, path: Path) -> "JsonSource":
+        return cls(Path(path).read_text(encoding="utf-8"), str(path))
+
+    def line_of(self, path: Sequence[Union[str, int]]) -> int:
+        """Line of ``path``, or of its closest existing parent (e.g. for a missing required key)."""
+        key = tuple(path)
+        while key not in self.positions:
+            if not key:
+                raise KeyError(f"Path {list(path)!r} not found")
+            key = key[:-1]
+        return self.positions[key]
+
+    def _line(self, offset: int) -> int:
+        return bisect.bisect_left(self._newlines, offset) + 1
+
+    def _skip(self, index: int) -> int:
+        match = _WHITESPACE.match(self.text, index)
+        return match.end() if match is not None else index
+
+    def _value(self, index: int, path: JsonPath) -> Tuple[Any, int]:
+        text = self.text
+        index = self._skip(index)
+        if path not in self.positions:
+            self.positions[path] = self._line(index)
+        char = text[index : index + 1]
+        if char == "{":
+            return self._object(index + 1, path)
+        if char == "[":
+            return self._array(index + 1, path)
+        if char == '"':
+            return self._string(index)
+        number = NUMBER_RE.match(text, index)
+        if number is not None:
+            integer, fraction, exponent = number.groups()
+            value = float(integer + (fraction or "") + (exponent or "")) if fraction or exponent else int(integer)
+            return value, number.end()
+        for literal, constant in _LITERALS.items():
+            if text.startswith(literal, index):
+                return constant, index + len(literal)
+        raise json.JSONDecodeError("Expecting value", text, index)
+
+    def _string(self, index: int) -> Tuple[str, int]:
+        match = _STRING.match(self.text, index)
+        if match is None:
+            raise json.JSONDecodeError("Unterminated string", self.text, index)
+        string: str = json.loads(match.group())
+        return string, match.end()
+
+    def _object(self, index: int, path: JsonPath) -> Tuple[Dict[str, Any], int]:
+        text = self.text
+        result: Dict[str, Any] = {}
+        index = self._skip(index)
+        if text[index : index + 1] == "}":
+            return result, index + 1
+        while True:
+            if text[index : index + 1] != '"':
+                raise json.JSONDecodeError("Expecting property name enclosed in double quotes", text, index)
+            line = self._line(index)
+            key, index = self._string(index)
+            self.positions[path + (key,)] = line
+            index = self._skip(index)
+            if text[index : index + 1] != ":":
+                raise json.JSONDecodeError("Expecting ':' delimiter", text, index)
+            result[key], index = self._value(index + 1, path + (key,))
+            index = self._skip(index)
+            char = text[index : index + 1]
+            if char == "}":
+                return result, index + 1
+            if char != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", text, index)
+            index = self._skip(index + 1)
+
+    def _array(self, index: int, path: JsonPath) -> Tuple[List[Any], int]:
+        text = self.text
+        result: List[Any] = []
+        index = self._skip(index)
+        if text[index : index + 1] == "]":
+            return result, index + 1
+        while True:
+            value, index = self._value(index, path + (len(result),))
+            result.append(value)
+            index = self._skip(index)
+            char = text[index : index + 1]
+            if char == "]":
+                return result, index + 1
+            if char != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", text, index)
+            index += 1
 
 
 class SchemaError(Exception):
-    def __init__(self, message: str, validator: str, validator_value: str, instance: Any, path: List[str], data: Any) -> None:
+    def __init__(
+        self,
+        message: str,
+        validator: str,
+        validator_value: str,
+        instance: Any,
+        path: List[str],
+        data: Any,
+        source: Optional[JsonSource] = None,
+        root: JsonPath = (),
+    ) -> None:
         super().__init__(message)
         self._message = message
         self._validator = validator
@@ -52,14 +159,21 @@ class SchemaError(Exception):
         self._path = path
 
         self.data = data
+        # Where ``data`` sits inside ``source``; without a source the data is dumped and parsed once.
+        self.source = source
+        self.root = root
         self._handlers = {
             "additionalProperties": self._handle_additional_properties,
         }
 
+    def _source(self) -> JsonSource:
+        if self.source is None:
+            self.source = JsonSource(json.dumps(self.data, indent=4, ensure_ascii=False, default=_plain))
+        return self.source
+
     @property
     def error_line(self) -> int:
-        dfs = DFS(target_path=self.path)
-        return dfs.path_to_number(self.data)
+        return self._source().line_of(self.root + tuple(self.path))
 
     @property
     def path(self) -> List[str]:
@@ -74,8 +188,11 @@ class SchemaError(Exception):
         return self._message
 
     def _handle_additional_properties(self) -> str:
-        key = self.message.split("('")[1].split("'")[0]
-        self._path.append(key)
+        # Point at the first unexpected key instead of the object holding it.
+        if "('" in self._message:
+            key = self._message.split("('")[1].split("'")[0]
+            if self._path[-1:] != [key]:
+                self._path.append(key)
         return self._message
 
     def print_context(
@@ -84,7 +201,8 @@ class SchemaError(Exception):
         after: int = 5,
     ) -> str:
         error_msg = ""
-        lines = json.dumps(self.data, indent=4, ensure_ascii=False).splitlines()
+        source = self._source()
+        lines = source.lines
         error_line = self.error_line
 
         start = max(1, error_line - before)
@@ -97,12 +215,62 @@ class SchemaError(Exception):
         return error_msg
 
 
+class SchemaRegistry:
+    """Compiled schema validators keyed by schema path and content hash."""
+
+    def __init__(self) -> None:
+        # path -> (stat signature, content hash, validator)
+        self._entries: Dict[str, Tuple[Tuple[int, int], str, Validator]] = {}
+        # (schema hash, payload fingerprint) pairs that already passed validation.
+        self.verified: Set[Tuple[str, str]] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, schema_path: Path) -> Validator:
+        key = str(Path(schema_path).resolve())
+        stat = Path(schema_path).stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == signature:
+            return entry[2]
+
+        raw_schema = Path(schema_path).read_bytes()
+        digest = hashlib.sha256(raw_schema).hexdigest()
+        if entry is not None and entry[1] == digest:
+            validator = entry[2]
+        else:
+            schema = json.loads(raw_schema.decode("utf-8"))
+            ContentValidator.check_schema(schema)
+            validator = ContentValidator(schema)
+        self._entries[key] = (signature, digest, validator)
+        return validator
+
+    def seed(self, schema_path: Path, signature: Tuple[int, int], digest: str, schema: Any) -> None:
+        """Register an already checked schema (e.g. from a compiled bundle) without reading the file."""
+        self._entries[str(Path(schema_path).resolve())] = (signature, digest, ContentValidator(schema))
+
+    def digest(self, schema_path: Path) -> str:
+        self.get(schema_path)
+        return self._entries[str(Path(schema_path).resolve())][1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.verified.clear()
+
+
+SCHEMA_REGISTRY = SchemaRegistry()
+
+
 class SchemaValidator:
-    def __init__(self, error_scope: int = 0) -> None:
+    def __init__(self, error_scope: int = 0, registry: Optional[SchemaRegistry] = None) -> None:
         self.error_scope = error_scope
+        self.registry = registry if registry is not None else SCHEMA_REGISTRY
 
     def verify_json(self, main_schema: Any, data: Any) -> None:
-        validator = Draft202012Validator(main_schema)
+        self.verify_with(ContentValidator(main_schema), data)
+
+    def verify_with(self, validator: Validator, data: Any) -> None:
         for err in validator.iter_errors(data):
             error = SchemaError(
                 data=data,
@@ -116,7 +284,13 @@ class SchemaValidator:
                 print(error.print_context(self.error_scope, self.error_scope))
             raise error
 
-    def verify_json_by_path(self, main_schema: Path, data: Any) -> None:
-        raw_main_schema = main_schema.read_text()
-        main_schema_dict = json.loads(raw_main_schema)
-        self.verify_json(main_schema_dict, data)
+    def verify_json_by_path(self, main_schema: Path, data: Any, fingerprint: Optional[str] = None) -> None:
+        """Validate ``data``; with a ``fingerprint`` a payload already accepted by this schema is skipped."""
+        validator = self.registry.get(main_schema)
+        if fingerprint is None:
+            self.verify_with(validator, data)
+            return
+        token = (self.registry.digest(main_schema), fingerprint)
+        if token not in self.registry.verified:
+            self.verify_with(validator, data)
+            self.registry.verified.add(token)
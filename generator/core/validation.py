@@ -0,0 +1,133 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Tuple
+import hashlib
+import json
+
+from generator.core.validate_json import SCHEMA_REGISTRY, JsonSource, SchemaError
+
+
+class Occurrence(NamedTuple):
+    source: JsonSource
+    position: int  # index of the block in its JSON file
+    block_name: str
+
+
+class ValidationIssue(NamedTuple):
+    file: str
+    line: int
+    block_name: str
+    message: str
+    context: str
+
+
+class ValidationReport(NamedTuple):
+    files: int
+    payloads: int
+    unique: int
+    issues: List[ValidationIssue]
+
+
+def _payload_key(schema_path: Path, content: Any) -> str:
+    raw = json.dumps([str(schema_path), content], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _validate_payload(schema_path: Path, content: Any) -> List[Dict[str, Any]]:
+    """Every error of one payload as plain fields, so results can cross process boundaries."""
+    validator = SCHEMA_REGISTRY.get(schema_path)
+    return [
+        {
+            "message": error.message,
+            "validator": error.validator,
+            "validator_value": error.validator_value,
+            "instance": error.instance,
+            "path": list(error.absolute_path),
+        }
+        for error in validator.iter_errors(content)
+    ]
+
+
+def _validate_safely(schema_path: Path, content: Any) -> Tuple[List[Dict[str, Any]], str]:
+    try:
+        return _validate_payload(schema_path, content), ""
+    except Exception as error:  # an invalid schema must not hide the other results
+        return [], f"Invalid schema {schema_path}: {error}"
+
+
+def collect_payloads(
+    json_directory: Path, block_directory: Path
+) -> Tuple[int, Dict[str, Tuple[Path, Any]], Dict[str, List[Occurrence]], List[ValidationIssue]]:
+    """Parse every backbone file once and group block payloads by (schema, content) hash."""
+    payloads: Dict[str, Tuple[Path, Any]] = {}
+    occurrences: Dict[str, List[Occurrence]] = {}
+    issues: List[ValidationIssue] = []
+    json_files = sorted(Path(json_directory).glob("*.json"))
+    for json_file in json_files:
+        try:
+            source = JsonSource.from_file(json_file)
+        except json.JSONDecodeError as error:
+            issues.append(ValidationIssue(str(json_file), error.lineno, "", f"Invalid JSON: {error.msg}", ""))
+            continue
+        if not isinstance(source.data, list):
+            issues.append(ValidationIssue(str(json_file), 1, "", f"Expected Block list, got: {type(source.data)}", ""))
+            continue
+
+        for index, block in enumerate(source.data):
+            line = source.line_of((index,))
+            if not isinstance(block, dict):
+                issues.append(ValidationIssue(str(json_file), line, "", f"Expected Block dictionary, got: {type(block)}", ""))
+                continue
+            block_name = str(block.get("block_name", ""))
+            missing = [key for key in ("block_name", "content_type", "content_lang", "content") if key not in block]
+            if missing:
+                issues.append(ValidationIssue(str(json_file), line, block_name, f"Missing keys: {', '.join(missing)}", ""))
+                continue
+            schema_path = Path(block_directory) / block_name / "content.schema"
+            if not schema_path.is_file():
+                issues.append(ValidationIssue(str(json_file), line, block_name, f"Schema {schema_path} not found", ""))
+                continue
+            key = _payload_key(schema_path, block["content"])
+            payloads.setdefault(key, (schema_path, block["content"]))
+            occurrences.setdefault(key, []).append(Occurrence(source, index, block_name))
+    return len(json_files), payloads, occurrences, issues
+
+
+def validate_backbone(json_directory: Path, block_directory: Path, jobs: int = 1, context: int = 3) -> ValidationReport:
+    """Validate each unique block payload once and report every error with its source line.
+
+    Unlike the build, validation does not stop at the first error. With ``jobs`` > 1 payloads are
+    validated in worker processes.
+    """
+    files, payloads, occurrences, issues = collect_payloads(json_directory, block_directory)
+    keys = list(payloads)
+    arguments = [payloads[key] for key in keys]
+    if jobs > 1 and len(keys) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_validate_safely, *zip(*arguments)))
+    else:
+        results = [_validate_safely(schema_path, content) for schema_path, content in arguments]
+
+    for key, (errors, schema_problem) in zip(keys, results):
+        for occurrence in occurrences[key]:
+            file = occurrence.source.name
+            if schema_problem:
+                line = occurrence.source.line_of((occurrence.position,))
+                issues.append(ValidationIssue(file, line, occurrence.block_name, schema_problem, ""))
+            for fields in errors:
+                error = SchemaError(data=payloads[key][1], source=occurrence.source, root=(occurrence.position, "content"), **fields)
+                message = error.message
+                location = ".".join(str(part) for part in ["content"] + error.path)
+                issues.append(
+                    ValidationIssue(file, error.error_line, occurrence.block_name, f"{location}: {message}", error.print_context(context, context))
+                )
+
+    issues.sort(key=lambda issue: (issue.file, issue.line))
+    return ValidationReport(files, sum(len(items) for items in occurrences.values()), len(keys), issues)
+
+
+def format_issue(issue: ValidationIssue) -> str:
+    block = f" [{issue.block_name}]" if issue.block_name else ""
+    text = f"{issue.file}:{issue.line}:{block} {issue.message}"
+    return text + ("\n" + issue.context.rstrip("\n") if issue.context else "")
@@ -0,0 +1,27 @@
+import json
+import os
+import tempfile
+import unittest
+
+from generator import check_assets
+
+
+class ReportTest(unittest.TestCase):
+    def test_report_records_the_scanned_root(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            root = os.path.join(directory, "public")
+            os.mkdir(root)
+            with open(os.path.join(root, "index.html"), "w", encoding="utf-8") as f:
+                f.write('<img src="missing.png"><a href="index.html">home</a>')
+            report_file = os.path.join(directory, "report.json")
+
+            self.assertFalse(check_assets.main(root, report_file))
+
+            with open(report_file, encoding="utf-8") as f:
+                report = json.load(f)
+            self.assertEqual(report["root"], root)
+            self.assertEqual(report["broken"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+from generator.core.css_purge import CRITICAL_BYTES, CssOptimizer, specificity
+
+
+def page(css: str, above: str, below: str) -> str:
+    filler = "<div>" + "x" * CRITICAL_BYTES + "</div>"
+    return f"<html><head><style>{css}</style></head>\n<body>{above}{filler}{below}</body></html>"
+
+
+class CriticalCssTest(unittest.TestCase):
+    def optimize(self, html: str) -> str:
+        return CssOptimizer().optimize(html, purge=False, critical=True)
+
+    def test_below_fold_rule_is_deferred(self) -> None:
+        html = self.optimize(page(".top{color:green} .other{margin:0}", '<p class="top">t</p>', '<p class="other">o</p>'))
+        head, body = html.split("</head>")
+        self.assertNotIn(".other", head)
+        self.assertIn(".other{margin:0}", body)
+
+    def test_rule_tying_with_later_critical_rule_keeps_source_order(self) -> None:
+        css = ".below{color:red} .txt{color:blue}"
+        html = self.optimize(page(css, '<p class="txt">t</p>', '<p class="below txt">b</p>'))
+        head = html.split("</head>")[0]
+        self.assertLess(head.index(".below{color:red}"), head.index(".txt{color:blue}"))
+        self.assertEqual(html.count("<style"), 1)
+
+    def test_rule_with_other_specificity_is_still_deferred(self) -> None:
+        css = "p.below{color:red} .txt{color:blue}"
+        html = self.optimize(page(css, '<p class="txt">t</p>', '<p class="below txt">b</p>'))
+        self.assertNotIn("p.below", html.split("</head>")[0])
+
+    def test_specificity(self) -> None:
+        self.assertEqual(specificity("#nav .item:hover"), (1, 2, 0))
+        self.assertEqual(specificity("ul > li::before"), (0, 0, 3))
+        self.assertEqual(specificity("input[type=text]"), (0, 1, 1))
+        self.assertIsNone(specificity("li:not(.x)"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+
+from generator.core.hints import HintConfig, collect_hints
+
+CSS = """
+@media (min-width: 1024px) { .side { background-image: url("sources/hero.jpg"); } }
+.side { position: fixed; }
+.logo { background: url(sources/unused.png) no-repeat; }
+"""
+
+
+class PreloadTest(unittest.TestCase):
+    def test_css_background_of_fixed_element_is_preloaded_with_its_media(self) -> None:
+        html = f'<html><head><style>{CSS}</style></head><body><img src="sources/logo.svg"><div class="side"></div></body></html>'
+        self.assertEqual(
+            collect_hints(html, HintConfig()),
+            ['<link rel="preload" as="image" href="sources/hero.jpg" media="(min-width: 1024px)" fetchpriority="high">'],
+        )
+
+    def test_already_preloaded_image_is_not_repeated(self) -> None:
+        head = f'<link rel="preload" as="image" href="sources/hero.jpg"><style>{CSS}</style>'
+        html = f'<html><head>{head}</head><body><img src="sources/logo.svg"><div class="side"></div></body></html>'
+        self.assertEqual(collect_hints(html, HintConfig()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from generator.core.images import ImageManifest, no_picture
+
+
+class PictureTest(unittest.TestCase):
+    def manifest(self, variants: dict) -> ImageManifest:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        manifest = ImageManifest(Path(directory.name))
+        manifest.images = {"sources/a.jpg": {"hash": "0", "width": 480, "height": 320, "variants": variants}}
+        return manifest
+
+    def test_webp_variants_go_into_a_typed_source(self) -> None:
+        manifest = self.manifest({"source": [["v/a.160w.jpg", 160], ["sources/a.jpg", 480]], "webp": [["v/a.160w.webp", 160], ["v/a.480w.webp", 480]]})
+        self.assertEqual(
+            manifest.picture("50vw", src="sources/a.jpg", alt="A", loading="lazy"),
+            '<picture><source type="image/webp" srcset="v/a.160w.webp 160w, v/a.480w.webp 480w" sizes="50vw">'
+            '<img src="sources/a.jpg" srcset="v/a.160w.jpg 160w, sources/a.jpg 480w" sizes="50vw" width="480" height="320" alt="A" loading="lazy">'
+            "</picture>",
+        )
+
+    def test_without_webp_only_the_img_is_emitted(self) -> None:
+        manifest = self.manifest({"source": [["sources/a.jpg", 480]]})
+        self.assertEqual(
+            manifest.picture("50vw", src="sources/a.jpg", alt="A"),
+            '<img src="sources/a.jpg" srcset="sources/a.jpg 480w" sizes="50vw" width="480" height="320" alt="A">',
+        )
+
+    def test_unknown_source_is_a_plain_img(self) -> None:
+        self.assertEqual(self.manifest({}).picture("50vw", src="sources/b.png", alt="B"), no_picture(src="sources/b.png", alt="B"))
+        self.assertEqual(no_picture("50vw", src="sources/b.png", alt="B"), '<img src="sources/b.png" alt="B">')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from generator import cli
+from generator.core.manifest import MANIFEST_VERSION, BuildManifest
+
+
+class ForcedBuildTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.previous = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+        self.addCleanup(self.directory.cleanup)
+        self.addCleanup(os.chdir, self.previous)
+        Path("sites").mkdir()
+        self.pages = {}
+        manifest = BuildManifest(cli.MANIFEST_FILE)
+        for name in ("consular_ua.html", "consular_ru.html"):
+            page = Path("sites") / name
+            page.write_text(name, encoding="utf-8")
+            manifest.record(page, {"generator": "1"})
+            self.pages[name] = page
+        manifest.save()
+
+    def test_forced_single_page_build_keeps_other_entries(self) -> None:
+        manifest = cli._manifest(True)
+        page = self.pages["consular_ua.html"]
+        self.assertFalse(manifest.is_fresh(page, {"generator": "1"}))
+        manifest.record(page, {"generator": "2"})
+        manifest.save()
+
+        data = json.loads(cli.MANIFEST_FILE.read_text(encoding="utf-8"))
+        self.assertEqual(data["version"], MANIFEST_VERSION)
+        self.assertEqual(sorted(data["pages"]), ["consular_ru.html", "consular_ua.html"])
+        self.assertTrue(BuildManifest(cli.MANIFEST_FILE).is_fresh(self.pages["consular_ru.html"], {"generator": "1"}))
+
+    def test_unforced_manifest_skips_unchanged_pages(self) -> None:
+        self.assertTrue(cli._manifest(False).is_fresh(self.pages["consular_ua.html"], {"generator": "1"}))
+
+
+if __name__ == "__main__":
+    unittest.main()